@@ -1,20 +1,63 @@
 """Flask backend for Nexus-style BT resource sharing application."""
 
+import atexit
+import gzip
 import hashlib
+import hmac
+import importlib.util
 import io
+import logging
+import logging.handlers
 import mimetypes
 import os
+import queue
 import re
+import stat
 import sys
+import tempfile
+import threading
 import time
-import traceback
-from collections import defaultdict
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
 
-from flask import Flask, jsonify, request, send_file, url_for
+from flask import Flask, Response, request, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from werkzeug.utils import send_file as werkzeug_send_file
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+try:
+    import blake3
+except ImportError:  # pragma: no cover - optional dependency
+    blake3 = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.parser import ParseFailedException
+    from streaming_form_data.targets import BaseTarget, ValueTarget
+    from streaming_form_data.validators import MaxSizeValidator, ValidationError
+except ImportError:  # pragma: no cover - optional dependency
+    StreamingFormDataParser = None
 
 # Ensure project root (Nexus/) is in sys.path so "hyperledger" can be imported
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,31 +75,419 @@ except Exception as e:  # pragma: no cover - import guard for developer ergonomi
         "Please ensure hyperledger/ledger.py exports ResourceSharingSystem."
     ) from e
 
+# Handler failures are logged through a queue: the request thread only formats
+# the record, and a listener thread does the (possibly blocking) stderr write.
+logger = logging.getLogger("backend.app")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+LOG_QUEUE: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+logger.addHandler(logging.handlers.QueueHandler(LOG_QUEUE))
+LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, _log_stream_handler)
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (used for request bodies and jsonify)."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)
+# Behind a front-end server with X-Sendfile support, stored downloads are
+# handed off by path instead of being streamed through Python.
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "0") == "1"
+# nginx equivalent: an internal location that aliases backend/uploads/, e.g.
+# X_ACCEL_REDIRECT_PREFIX=/protected-uploads/ for "location /protected-uploads/".
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX", "")
 
 # Single global ResourceSharingSystem instance
 system: ResourceSharingSystem = ResourceSharingSystem()
 
 UPLOAD_ROOT = os.path.join(ROOT, "backend", "uploads")
 MAX_UPLOAD_BYTES = 100 * 1024 * 1024  # 100 MB cap per requirements
+HASH_CHUNK_BYTES = 1024 * 1024
+UPLOAD_READ_CHUNK_BYTES = 256 * 1024  # request-stream reads when parsing uploads ourselves
+MAX_JSON_BODY_BYTES = 1024 * 1024  # JSON API bodies are small; uploads use multipart
+
+
+def read_umask() -> int:
+    # os.umask can only be read by setting it, so this runs once, at import.
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+# Temporary files are created 0600; stored uploads get the mode a plain open()
+# would give them, so a proxy serving X-Sendfile/X-Accel-Redirect can read them.
+UPLOAD_FILE_MODE = 0o666 & ~read_umask()
+# Content fingerprints use BLAKE3 when the optional package is installed; the
+# algorithm is stored with each ledger entry as hash_algorithm.
+CONTENT_HASHERS: Dict[str, Any] = {"sha256": hashlib.sha256}
+if blake3 is not None:
+    CONTENT_HASHERS["blake3"] = blake3.blake3
+CONTENT_HASH_ALGORITHM = "blake3" if blake3 is not None else "sha256"
+# Digests of stored files keyed by (path, algorithm, st_mtime_ns, st_size), least recently used first.
+FILE_HASH_CACHE_SIZE = 1024
+FILE_HASH_CACHE: "OrderedDict[Tuple[str, str, int, int], str]" = OrderedDict()
+FILE_HASH_CACHE_LOCK = threading.Lock()
+# Stored files that need re-hashing during duplicate checks are read in parallel.
+FILE_HASH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hasher")
 os.makedirs(UPLOAD_ROOT, exist_ok=True)
 
+# Proof-of-work runs on this pool when a client asks for asynchronous mining so
+# cheap endpoints are not queued behind a busy request thread.
+MINING_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="miner")
+# job_id -> (submitted at, future), oldest first. Finished jobs are dropped when
+# polled, or MINING_JOB_TTL_SECONDS after submission if nobody polls them.
+MINING_JOB_TTL_SECONDS = 600
+MINING_JOBS_MAX_ENTRIES = 1024
+MINING_JOBS: "OrderedDict[str, Tuple[float, Future]]" = OrderedDict()
+MINING_JOBS_LOCK = threading.Lock()
+
+# Optional batching window for /api/mine: a mining run first waits up to
+# MINE_BATCH_WINDOW_MS for MINE_BATCH_MAX_TRANSACTIONS pending transactions
+# (or a POST /api/mine/flush), so blocks carry more transactions under load.
+# Concurrent mine requests from the same miner share one run and one block.
+MINE_BATCH_WINDOW_SECONDS = float(os.environ.get("MINE_BATCH_WINDOW_MS", "0")) / 1000
+MINE_BATCH_MAX_TRANSACTIONS = int(os.environ.get("MINE_BATCH_MAX_TRANSACTIONS", "64"))
+MINING_IN_FLIGHT: Dict[str, Future] = {}
+MINING_IN_FLIGHT_LOCK = threading.Lock()
+# Notified by ledger_changed() and /api/mine/flush; MINE_FLUSH_COUNT tells
+# waiting runs that a flush was requested.
+PENDING_CHANGED = threading.Condition()
+MINE_FLUSH_COUNT = 0
+
 DOWNLOAD_ATTEMPT_LIMIT = 2
-DOWNLOAD_ATTEMPTS: Dict[Tuple[str, str, int], int] = defaultdict(int)
+# Per (downloader, owner, file_id) download counts, least recently used first.
+DOWNLOAD_ATTEMPTS_MAX_ENTRIES = 100_000
+DOWNLOAD_ATTEMPTS: "OrderedDict[Tuple[str, str, int], int]" = OrderedDict()
+DOWNLOAD_ATTEMPTS_LOCK = threading.Lock()
+
+# Role names are interned so role checks compare identical string objects.
+ROLE_ADMINISTRATOR = sys.intern("administrator")
+ROLE_MEMBER = sys.intern("member")
+
+# Passwords are stored as salted PBKDF2-SHA256 digests ("pbkdf2_sha256$iterations$salt$digest").
+PASSWORD_HASH_ITERATIONS = 100_000
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PASSWORD_HASH_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(record: Optional[Dict[str, str]], password: Any) -> bool:
+    """Check ``password`` against a credential record in constant time."""
+    if not isinstance(password, str):
+        return False
+    candidate = password.encode("utf-8")
+    # Unknown accounts are checked against a throwaway hash so they take as long as known ones.
+    stored = record.get("password_hash", "") if record else UNKNOWN_USER_PASSWORD_HASH
+    try:
+        _, iterations, salt, digest = stored.split("$")
+        expected = bytes.fromhex(digest)
+        actual = hashlib.pbkdf2_hmac("sha256", candidate, bytes.fromhex(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected) and bool(record)
+
+
+def password_needs_rehash(record: Dict[str, str]) -> bool:
+    """True when the stored hash was made with other than PASSWORD_HASH_ITERATIONS iterations."""
+    try:
+        _, iterations, _, _ = record.get("password_hash", "").split("$")
+        return int(iterations) != PASSWORD_HASH_ITERATIONS
+    except ValueError:
+        return True
+
+
+UNKNOWN_USER_PASSWORD_HASH = hash_password(uuid.uuid4().hex)
 
 # Demo credential store used by the Vue frontend.
 USERS: Dict[str, Dict[str, str]] = {
-    "admin": {"password": "admin", "role": "administrator"},
+    "admin": {"password_hash": hash_password("admin"), "role": ROLE_ADMINISTRATOR},
     # Demo seed accounts so you can test uploads/downloads without registering first.
-    "alice": {"password": "alice", "role": "member"},
-    "bob": {"password": "bob", "role": "member"},
+    "alice": {"password_hash": hash_password("alice"), "role": ROLE_MEMBER},
+    "bob": {"password_hash": hash_password("bob"), "role": ROLE_MEMBER},
 }
 
+# Optional shared credential store. When REDIS_URL is set every worker
+# process reads accounts from Redis instead of its own copy of USERS.
+REDIS_URL = os.environ.get("REDIS_URL", "").strip()
+
+
+def connect_redis(decode_responses: bool = True):
+    if not REDIS_URL:
+        return None
+    if redis is None:
+        raise ImportError("REDIS_URL is set but the 'redis' package is not installed.")
+    pool = redis.ConnectionPool.from_url(REDIS_URL, decode_responses=decode_responses)
+    return redis.Redis(connection_pool=pool)
+
+
+redis_client = connect_redis()
+# Cached response bodies are bytes, so they go through a client that leaves them undecoded.
+redis_cache_client = connect_redis(decode_responses=False)
+
+
+def get_user_record(username: str) -> Optional[Dict[str, str]]:
+    """Return the credential record for ``username`` from the active store."""
+    if redis_client is not None:
+        return redis_client.hgetall(f"user:{username}") or None
+    return USERS.get(username)
+
+
+def user_exists(username: str) -> bool:
+    if redis_client is not None:
+        return bool(redis_client.exists(f"user:{username}"))
+    return username in USERS
+
+
+def save_user_record(username: str, record: Dict[str, str]) -> None:
+    ROLE_CACHE.pop(username, None)
+    if redis_client is not None:
+        redis_client.hset(f"user:{username}", mapping=record)
+        return
+    USERS[username] = record
+
+
+# Roles of known accounts, so permission checks on polled endpoints skip the
+# credential store (a Redis round trip when REDIS_URL is set). Only existing
+# accounts are cached: an account registered through another worker must
+# become visible immediately.
+ROLE_CACHE_TTL_SECONDS = 600
+ROLE_CACHE: Dict[str, Tuple[str, float]] = {}
+
+
+def get_user_role(username: str) -> Optional[str]:
+    """Return the role of ``username`` ("" when unset), or None for unknown accounts."""
+    now = time.monotonic()
+    cached = ROLE_CACHE.get(username)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    record = get_user_record(username)
+    if not record:
+        return None
+    role = sys.intern(record.get("role") or "")
+    ROLE_CACHE[username] = (role, now + ROLE_CACHE_TTL_SECONDS)
+    return role
+
+
+# Short-lived cache for read-heavy ledger endpoints. Entries live in Redis when
+# it is configured and in RESPONSE_CACHE otherwise; any ledger mutation drops them.
+RESPONSE_CACHE_TTL_SECONDS = 10
+# Freshness per endpoint: the catalogue is polled hardest and goes stale fastest.
+RESPONSE_CACHE_POLICIES = {"short": 5, "normal": RESPONSE_CACHE_TTL_SECONDS}
+# Least recently used first; expired entries are dropped when read.
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+RESPONSE_CACHE_LOCK = threading.Lock()
+RESPONSE_CACHE_KEYS = "cache:keys"
+# Bumped by ledger_changed() so a body built before a mutation is never stored after it.
+RESPONSE_CACHE_GENERATION = 0
+# Cached bodies above this size are compressed for clients that accept it; the
+# encoded bytes are kept per (ETag, encoding) so repeat polls skip the work.
+COMPRESS_MIN_BYTES = 1024
+COMPRESSORS: Dict[str, Any] = {"gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=4)
+COMPRESSION_PREFERENCE = [encoding for encoding in ("br", "gzip") if encoding in COMPRESSORS]
+COMPRESSED_BODIES_MAX_ENTRIES = 64
+COMPRESSED_BODIES: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+COMPRESSED_BODIES_LOCK = threading.Lock()
+# The last body built for each key outlives invalidation and is served when a
+# rebuild fails, so a ledger error degrades to slightly old data instead of a 500.
+# Entries are (expires at, body); past STALE_RESPONSE_TTL_SECONDS they are dropped.
+STALE_RESPONSE_TTL_SECONDS = 300
+STALE_RESPONSES_MAX_ENTRIES = 256
+STALE_RESPONSES: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+STALE_RESPONSES_LOCK = threading.Lock()
+
+
+def get_cached_response(key: str) -> Optional[Any]:
+    if redis_cache_client is not None:
+        return redis_cache_client.get(f"cache:{key}")
+    with RESPONSE_CACHE_LOCK:
+        entry = RESPONSE_CACHE.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del RESPONSE_CACHE[key]
+            return None
+        RESPONSE_CACHE.move_to_end(key)
+        return entry[1]
+
+
+def set_cached_response(
+    key: str, body: bytes, generation: Optional[int] = None, ttl: int = RESPONSE_CACHE_TTL_SECONDS
+) -> None:
+    if generation is not None and generation != RESPONSE_CACHE_GENERATION:
+        return
+    if redis_cache_client is not None:
+        pipe = redis_cache_client.pipeline()
+        pipe.set(f"cache:{key}", body, ex=ttl)
+        pipe.sadd(RESPONSE_CACHE_KEYS, f"cache:{key}")
+        pipe.execute()
+        return
+    with RESPONSE_CACHE_LOCK:
+        RESPONSE_CACHE[key] = (time.monotonic() + ttl, body)
+        RESPONSE_CACHE.move_to_end(key)
+        while len(RESPONSE_CACHE) > RESPONSE_CACHE_MAX_ENTRIES:
+            RESPONSE_CACHE.popitem(last=False)
+
+
+def remember_stale_response(key: str, body: bytes) -> None:
+    if redis_cache_client is not None:
+        # Deliberately not tracked in RESPONSE_CACHE_KEYS, so ledger_changed() keeps it.
+        redis_cache_client.set(f"stale:{key}", body, ex=STALE_RESPONSE_TTL_SECONDS)
+        return
+    with STALE_RESPONSES_LOCK:
+        STALE_RESPONSES[key] = (time.monotonic() + STALE_RESPONSE_TTL_SECONDS, body)
+        STALE_RESPONSES.move_to_end(key)
+        while len(STALE_RESPONSES) > STALE_RESPONSES_MAX_ENTRIES:
+            STALE_RESPONSES.popitem(last=False)
+
+
+def get_stale_response(key: str) -> Optional[Any]:
+    if redis_cache_client is not None:
+        return redis_cache_client.get(f"stale:{key}")
+    with STALE_RESPONSES_LOCK:
+        entry = STALE_RESPONSES.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del STALE_RESPONSES[key]
+            return None
+        return entry[1]
+
+
+def ledger_changed() -> None:
+    """Drop cached responses after the ledger or a catalogue entry mutates."""
+    global RESPONSE_CACHE_GENERATION
+    RESPONSE_CACHE_GENERATION += 1
+    if MINE_BATCH_WINDOW_SECONDS > 0:
+        with PENDING_CHANGED:
+            PENDING_CHANGED.notify_all()
+    if redis_cache_client is not None:
+        keys = redis_cache_client.smembers(RESPONSE_CACHE_KEYS)
+        redis_cache_client.delete(RESPONSE_CACHE_KEYS, *keys)
+        return
+    with RESPONSE_CACHE_LOCK:
+        RESPONSE_CACHE.clear()
+
+
+def compress_body(etag: str, encoding: str, body: bytes) -> bytes:
+    key = (etag, encoding)
+    with COMPRESSED_BODIES_LOCK:
+        encoded = COMPRESSED_BODIES.get(key)
+        if encoded is not None:
+            COMPRESSED_BODIES.move_to_end(key)
+            return encoded
+    encoded = COMPRESSORS[encoding](body)
+    with COMPRESSED_BODIES_LOCK:
+        COMPRESSED_BODIES[key] = encoded
+        while len(COMPRESSED_BODIES) > COMPRESSED_BODIES_MAX_ENTRIES:
+            COMPRESSED_BODIES.popitem(last=False)
+    return encoded
+
+
+def conditional_json_body(body: bytes) -> Any:
+    """Serve a complete JSON body with a content ETag, answering 304 on a match.
+
+    The ETag is derived from the bytes rather than a per-process counter, so
+    workers sharing the Redis cache hand out the same validator. Bodies over
+    COMPRESS_MIN_BYTES are sent brotli- or gzip-encoded when the client
+    accepts it, with the encoding appended to the ETag.
+    """
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = request.accept_encodings.best_match(COMPRESSION_PREFERENCE)
+    if encoding:
+        response = Response(compress_body(etag, encoding, body), mimetype="application/json")
+        response.headers["Content-Encoding"] = encoding
+        etag = f"{etag}-{encoding}"
+    else:
+        response = Response(body, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def cached_json_response(key: str, build, policy: str = "normal") -> Any:
+    """Serve ``key`` from the response cache, building and storing it on a miss.
+
+    ``policy`` names an entry in RESPONSE_CACHE_POLICIES. If ``build`` raises,
+    the last body built for ``key`` is served instead when one is still held.
+    """
+    cached = get_cached_response(key)
+    if cached is not None:
+        return conditional_json_body(cached)
+    generation = RESPONSE_CACHE_GENERATION
+    try:
+        body = encode_json(build())
+    except Exception:
+        stale = get_stale_response(key)
+        if stale is None:
+            raise
+        logger.exception("serving stale %s after rebuild failed", key)
+        return conditional_json_body(stale)
+    set_cached_response(key, body, generation, RESPONSE_CACHE_POLICIES[policy])
+    remember_stale_response(key, body)
+    return conditional_json_body(body)
+
+
+def stream_cached_results(key: str, items) -> Any:
+    """Stream ``{"success": true, "results": [...]}`` one item at a time.
+
+    Only the first item is produced and encoded up front, so a failing ledger
+    call still raises inside the calling view; the rest is serialized as it
+    is sent. Past that point the 200 status is already out: an error is
+    logged here and aborts the response, leaving a truncated body the client
+    cannot parse. The encoded chunks are kept so the full body can be stored
+    in the response cache once the stream completes; later hits are served
+    whole, with an ETag.
+    """
+    cached = get_cached_response(key)
+    if cached is not None:
+        return conditional_json_body(cached)
+    generation = RESPONSE_CACHE_GENERATION
+    items = iter(items)
+    first = next(items, None)
+    chunks = [b'{"success":true,"results":[']
+    if first is not None:
+        chunks.append(encode_json(first))
+
+    def generate():
+        yield from chunks
+        try:
+            for item in items:
+                chunk = b"," + encode_json(item)
+                chunks.append(chunk)
+                yield chunk
+        except Exception:
+            logger.exception("streaming %s failed", key)
+            raise
+        chunks.append(b"]}")
+        yield chunks[-1]
+        set_cached_response(key, b"".join(chunks), generation)
+
+    return Response(generate(), mimetype="application/json")
+
 
 def is_administrator(username: str) -> bool:
-    record = USERS.get(username)
-    return bool(record and record.get("role") == "administrator")
+    return get_user_role(username) == ROLE_ADMINISTRATOR
 
 FILE_CATEGORIES: List[Dict[str, str]] = [
     {"value": "document", "label": "Document"},
@@ -72,10 +503,21 @@ FILE_CATEGORIES: List[Dict[str, str]] = [
 CATEGORY_LABEL_LOOKUP = {entry["value"]: entry["label"] for entry in FILE_CATEGORIES}
 DEFAULT_CATEGORY = "other"
 
+# SharedFile fields accepted from POST /api/declare; the ledger assigns id and owner_address.
+DECLARE_REQUIRED_FIELDS = ("name", "size_gb", "uploader", "seeds", "peers", "description")
+DECLARE_OPTIONAL_FIELDS = (
+    "file_hash", "content_hash", "category", "extension", "upload_time", "is_active", "storage_path",
+    "hash_algorithm",
+)
+
 
 def bootstrap_demo_accounts() -> None:
     """Ensure the built-in demo accounts exist in the ledger layer."""
-    for username in USERS:
+    for username, record in USERS.items():
+        if redis_client is not None:
+            key = f"user:{username}"
+            for field, value in record.items():
+                redis_client.hsetnx(key, field, value)
         ensure_ledger_user(username)
 
 
@@ -83,11 +525,18 @@ def ensure_ledger_user(username: str):
     """Return an existing ledger user or register a new one on demand."""
     user = system.get_user(username)
     if user is None:
-        user = system.register_user(username)
+        try:
+            user = system.register_user(username)
+        except ValueError:
+            # Another request registered the same user in the meantime.
+            user = system.get_user(username)
+        else:
+            ledger_changed()
     system.register_address(username, getattr(user, "address", None))
     return user
 
 
+@lru_cache(maxsize=4096)
 def format_size(size_gb: float) -> str:
     """Convert a size in gigabytes into a human friendly string."""
     if size_gb >= 1:
@@ -99,28 +548,31 @@ def format_size(size_gb: float) -> str:
     return f"{size_kb:.0f} KB"
 
 
+SIZE_PATTERN = re.compile(r"\s*([0-9]*\.?[0-9]+)\s*([a-zA-Z]*)\s*")
+SIZE_UNIT_MULTIPLIERS: Dict[str, float] = {
+    "kb": 1 / (1024 * 1024),
+    "mb": 1 / 1024,
+    "gb": 1,
+    "tb": 1024,
+}
+
+
 def parse_size_to_gb(size_text: str) -> float:
     """Parse size strings such as '42.7 MB' into gigabytes."""
     if not size_text:
         raise ValueError("size is required")
 
-    match = re.match(r"\s*([0-9]*\.?[0-9]+)\s*([a-zA-Z]*)\s*", size_text)
+    match = SIZE_PATTERN.match(size_text)
     if not match:
         raise ValueError("invalid size format")
 
     value = float(match.group(1))
     unit = match.group(2).lower() or "mb"
-    multipliers = {
-        "kb": 1 / (1024 * 1024),
-        "mb": 1 / 1024,
-        "gb": 1,
-        "tb": 1024,
-    }
-
-    if unit not in multipliers:
+    multiplier = SIZE_UNIT_MULTIPLIERS.get(unit)
+    if multiplier is None:
         raise ValueError(f"unsupported size unit '{unit}'")
 
-    return value * multipliers[unit]
+    return value * multiplier
 
 
 def bytes_to_gb(size_bytes: int) -> float:
@@ -134,10 +586,14 @@ def clamp_upload_size(size_bytes: int) -> None:
         raise ValueError("uploaded file exceeds the 100 MB limit")
 
 
+CATEGORY_SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+@lru_cache(maxsize=256)
 def normalize_category(raw: str) -> str:
     if not raw:
         return DEFAULT_CATEGORY
-    slug = re.sub(r"[^a-z0-9]+", "_", raw.strip().lower()).strip("_")
+    slug = CATEGORY_SLUG_PATTERN.sub("_", raw.strip().lower()).strip("_")
     if slug in CATEGORY_LABEL_LOOKUP:
         return slug
     if slug.endswith("s") and slug[:-1] in CATEGORY_LABEL_LOOKUP:
@@ -145,6 +601,7 @@ def normalize_category(raw: str) -> str:
     return DEFAULT_CATEGORY
 
 
+@lru_cache(maxsize=256)
 def category_label(value: str) -> str:
     normalized = normalize_category(value)
     return CATEGORY_LABEL_LOOKUP.get(normalized, normalized.title() or "Other")
@@ -152,58 +609,190 @@ def category_label(value: str) -> str:
 
 def iter_existing_files():
     """Yield (SharedFile, owner_username) tuples for all known resources."""
-    for file_obj in system.global_resource_manager.get_active_files():
-        yield file_obj, "community"
+    for owner, file_obj in system.iter_active_files():
+        yield file_obj, owner
+
+
+EXISTING_FILES_SNAPSHOT: Optional[Tuple[int, List[Tuple[Any, str]]]] = None
+
+
+def existing_files() -> List[Tuple[Any, str]]:
+    """Materialised iter_existing_files(), reused until ledger_changed() runs."""
+    global EXISTING_FILES_SNAPSHOT
+    generation = RESPONSE_CACHE_GENERATION
+    snapshot = EXISTING_FILES_SNAPSHOT
+    if snapshot is not None and snapshot[0] == generation:
+        return snapshot[1]
+    files = list(iter_existing_files())
+    EXISTING_FILES_SNAPSHOT = (generation, files)
+    return files
 
-    for username, user in system.users.items():
-        for file_obj in user.resource_manager.get_active_files():
-            yield file_obj, username
+
+@lru_cache(maxsize=4096)
+def normalize_username(name: str) -> str:
+    """Stripped, lower-cased form of a username, memoised across requests."""
+    return name.strip().lower()
 
 
 def build_download_key(downloader: str, owner: Optional[str], file_id: int) -> Tuple[str, str, int]:
     return (
-        (downloader or "").strip().lower(),
-        (owner or "community").strip().lower() or "community",
+        normalize_username(downloader or ""),
+        normalize_username(owner or "community") or "community",
         int(file_id),
     )
 
 
-def has_downloads_remaining(downloader: str, owner: Optional[str], file_id: int) -> bool:
-    key = build_download_key(downloader, owner, file_id)
-    return DOWNLOAD_ATTEMPTS[key] < DOWNLOAD_ATTEMPT_LIMIT
+def has_downloads_remaining(key: Tuple[str, str, int]) -> bool:
+    """Check a key from build_download_key; callers run this before any ledger work."""
+    return DOWNLOAD_ATTEMPTS.get(key, 0) < DOWNLOAD_ATTEMPT_LIMIT
+
 
+def record_download_attempt(key: Tuple[str, str, int]) -> None:
+    with DOWNLOAD_ATTEMPTS_LOCK:
+        DOWNLOAD_ATTEMPTS[key] = DOWNLOAD_ATTEMPTS.get(key, 0) + 1
+        DOWNLOAD_ATTEMPTS.move_to_end(key)
+        while len(DOWNLOAD_ATTEMPTS) > DOWNLOAD_ATTEMPTS_MAX_ENTRIES:
+            DOWNLOAD_ATTEMPTS.popitem(last=False)
 
-def record_download_attempt(downloader: str, owner: Optional[str], file_id: int) -> None:
-    key = build_download_key(downloader, owner, file_id)
-    DOWNLOAD_ATTEMPTS[key] += 1
 
+def iter_file_chunks(stream, chunk_size: int = HASH_CHUNK_BYTES) -> Iterator[Any]:
+    """Yield successive chunks of a binary stream.
 
-def compute_file_hash(path: str) -> Optional[str]:
-    if not path or not os.path.isfile(path):
+    Streams with readinto fill one reused buffer and yield memoryview slices
+    of it, so no bytes object is allocated per chunk; each chunk is only
+    valid until the next one is requested. Other streams fall back to read().
+    """
+    if not hasattr(stream, "readinto"):
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        size = stream.readinto(buffer)
+        if not size:
+            return
+        yield view[:size]
+
+
+def compute_file_hash(path: str, algorithm: str = CONTENT_HASH_ALGORITHM) -> Optional[str]:
+    """Digest of a stored file, memoised on its (path, mtime, size) signature."""
+    constructor = CONTENT_HASHERS[algorithm]
+    if not path:
         return None
-    hasher = hashlib.sha256()
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+
+    key = (path, algorithm, info.st_mtime_ns, info.st_size)
+    with FILE_HASH_CACHE_LOCK:
+        digest = FILE_HASH_CACHE.get(key)
+        if digest is not None:
+            FILE_HASH_CACHE.move_to_end(key)
+            return digest
+
     with open(path, "rb") as handle:
-        for chunk in iter(lambda: handle.read(8192), b""):
-            if not chunk:
-                break
-            hasher.update(chunk)
-    return hasher.hexdigest()
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: read/update loop runs in C
+            digest = hashlib.file_digest(handle, constructor).hexdigest()
+        else:
+            hasher = constructor()
+            for chunk in iter_file_chunks(handle):
+                hasher.update(chunk)
+            digest = hasher.hexdigest()
+
+    with FILE_HASH_CACHE_LOCK:
+        FILE_HASH_CACHE[key] = digest
+        while len(FILE_HASH_CACHE) > FILE_HASH_CACHE_SIZE:
+            FILE_HASH_CACHE.popitem(last=False)
+    return digest
+
+
+# (position in iter_existing_files order, SharedFile, owner username)
+ConflictEntry = Tuple[int, Any, str]
+
+
+class ConflictIndex(NamedTuple):
+    generation: int
+    names: Dict[str, List[ConflictEntry]]
+    short_hashes: Dict[str, List[ConflictEntry]]
+    full_hashes: Dict[str, List[ConflictEntry]]
+    unhashed: List[ConflictEntry]  # entries without a content_hash in CONTENT_HASH_ALGORITHM
+
+
+CONFLICT_INDEX: Optional[ConflictIndex] = None
+
+
+def conflict_index() -> ConflictIndex:
+    """Name/hash lookup tables for duplicate checks, rebuilt after ledger_changed()."""
+    global CONFLICT_INDEX
+    generation = RESPONSE_CACHE_GENERATION
+    index = CONFLICT_INDEX
+    if index is not None and index.generation == generation:
+        return index
+
+    names: Dict[str, List[ConflictEntry]] = defaultdict(list)
+    short_hashes: Dict[str, List[ConflictEntry]] = defaultdict(list)
+    full_hashes: Dict[str, List[ConflictEntry]] = defaultdict(list)
+    unhashed: List[ConflictEntry] = []
+    for position, (file_obj, owner) in enumerate(existing_files()):
+        entry = (position, file_obj, owner)
+        existing_base, _ = split_name(getattr(file_obj, "name", ""))
+        names[existing_base.strip().lower()].append(entry)
+        existing_short = str(getattr(file_obj, "file_hash", "") or "").lower()
+        existing_full = str(getattr(file_obj, "content_hash", "") or "").lower()
+        if existing_short:
+            short_hashes[existing_short].append(entry)
+        algorithm = getattr(file_obj, "hash_algorithm", "sha256") or "sha256"
+        if existing_full and algorithm == CONTENT_HASH_ALGORITHM:
+            full_hashes[existing_full].append(entry)
+        else:
+            unhashed.append(entry)
+
+    index = ConflictIndex(generation, dict(names), dict(short_hashes), dict(full_hashes), unhashed)
+    CONFLICT_INDEX = index
+    return index
 
 
 def find_name_conflict(username: str, base_name: str):
     target = (base_name or "").strip().lower()
     if not target:
         return None, None
-    for file_obj, owner in iter_existing_files():
-        if owner == username:
-            continue
-        existing_base, _ = split_name(getattr(file_obj, "name", ""))
-        if existing_base.strip().lower() == target:
+    for _, file_obj, owner in conflict_index().names.get(target, ()):
+        if owner != username:
             return file_obj, owner
     return None, None
 
 
-def normalize_block_payload(block_entry: Dict[str, Any]) -> Dict[str, Any]:
+def resolve_block_miner(block_entry: Dict[str, Any]) -> Optional[str]:
+    miner = block_entry.get("miner")
+    if not miner and block_entry.get("miner_address"):
+        miner = system.get_username_by_address(block_entry.get("miner_address"))
+    if block_entry.get("index") == 0 and not miner:
+        miner = "system"
+    return miner
+
+
+# Lower-cased "index miner hash" search text per block. Mined blocks never
+# change, so the text is keyed by block hash and reused across requests.
+BLOCK_SEARCH_TEXT: Dict[str, str] = {}
+
+
+def block_search_text(block_entry: Dict[str, Any], miner: Optional[str]) -> str:
+    block_hash = block_entry.get("hash") or ""
+    text = BLOCK_SEARCH_TEXT.get(block_hash)
+    if text is None:
+        text = " ".join([str(block_entry.get("index")), miner or "", block_hash]).lower()
+        if block_hash and miner:
+            BLOCK_SEARCH_TEXT[block_hash] = text
+    return text
+
+
+def normalize_block_payload(block_entry: Dict[str, Any], miner: Optional[str] = None) -> Dict[str, Any]:
     timestamp = block_entry.get("timestamp")
     dt: Optional[datetime] = None
     iso = None
@@ -215,11 +804,8 @@ def normalize_block_payload(block_entry: Dict[str, Any]) -> Dict[str, Any]:
         date_label = dt.strftime("%Y-%m-%d")
         time_label = dt.strftime("%H:%M:%S")
 
-    miner = block_entry.get("miner")
-    if not miner and block_entry.get("miner_address"):
-        miner = system.get_username_by_address(block_entry.get("miner_address"))
-    if block_entry.get("index") == 0 and not miner:
-        miner = "system"
+    if miner is None:
+        miner = resolve_block_miner(block_entry)
 
     return {
         "index": block_entry.get("index"),
@@ -238,33 +824,27 @@ def normalize_block_payload(block_entry: Dict[str, Any]) -> Dict[str, Any]:
 def list_blocks_for_viewer(viewer: str, search: str = "", block_filter: Optional[int] = None, miner_filter: str = ""):
     is_admin = is_administrator(viewer)
     normalized_search = (search or "").strip().lower()
-    normalized_miner = (miner_filter or "").strip().lower()
+    normalized_miner = normalize_username(miner_filter or "")
 
+    # Filter on the raw ledger entries; only surviving blocks pay for the
+    # datetime formatting in normalize_block_payload.
     payloads: List[Dict[str, Any]] = []
     for entry in system.list_blocks():
-        normalized_entry = normalize_block_payload(entry)
-
-        if not is_admin and normalized_entry.get("miner") != viewer:
+        index = entry.get("index")
+        if block_filter is not None and index != block_filter:
             continue
 
-        if block_filter is not None and normalized_entry.get("index") != block_filter:
+        miner = resolve_block_miner(entry)
+        if not is_admin and miner != viewer:
             continue
 
-        if normalized_miner and normalized_entry.get("miner", "").lower() != normalized_miner:
+        if normalized_miner and normalize_username(miner or "") != normalized_miner:
             continue
 
-        if normalized_search:
-            haystack = " ".join(
-                [
-                    str(normalized_entry.get("index", "")),
-                    normalized_entry.get("miner") or "",
-                    normalized_entry.get("hash") or "",
-                ]
-            ).lower()
-            if normalized_search not in haystack:
-                continue
+        if normalized_search and normalized_search not in block_search_text(entry, miner):
+            continue
 
-        payloads.append(normalized_entry)
+        payloads.append(normalize_block_payload(entry, miner))
 
     payloads.sort(key=lambda item: item.get("index", -1), reverse=True)
     return payloads
@@ -275,19 +855,41 @@ def find_content_conflict(username: str, content_hash: str, short_hash: str):
     target_short = (short_hash or "").lower()
     if not target_full and not target_short:
         return None, None
-    for file_obj, owner in iter_existing_files():
-        if owner == username:
-            continue
-        existing_short = str(getattr(file_obj, "file_hash", "") or "").lower()
-        existing_full = str(getattr(file_obj, "content_hash", "") or "").lower()
-        if target_short and existing_short and existing_short == target_short:
-            return file_obj, owner
-        if target_full and existing_full and existing_full == target_full:
-            return file_obj, owner
-        stored_hash = compute_file_hash(getattr(file_obj, "storage_path", ""))
-        if target_full and stored_hash and stored_hash.lower() == target_full:
-            return file_obj, owner
-    return None, None
+
+    # Report the earliest matching entry, as a scan of existing_files() would.
+    index = conflict_index()
+    match: Optional[ConflictEntry] = None
+    for table, target in ((index.short_hashes, target_short), (index.full_hashes, target_full)):
+        for entry in table.get(target, ()) if target else ():
+            if entry[2] != username:
+                if match is None or entry[0] < match[0]:
+                    match = entry
+                break
+
+    # Entries hashed differently (or not at all) are compared by hashing the
+    # stored file. The reads overlap on FILE_HASH_EXECUTOR, but results are
+    # checked in catalogue order so the earliest match still wins.
+    if target_full:
+        candidates = [
+            entry for entry in index.unhashed
+            if entry[2] != username
+            and getattr(entry[1], "storage_path", "")
+            and (match is None or entry[0] < match[0])
+        ]
+        futures = [FILE_HASH_EXECUTOR.submit(compute_file_hash, entry[1].storage_path) for entry in candidates]
+        try:
+            for entry, future in zip(candidates, futures):
+                stored_hash = future.result()
+                if stored_hash and stored_hash.lower() == target_full:
+                    match = entry
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+
+    if match is None:
+        return None, None
+    return match[1], match[2]
 
 
 def duplicate_response(conflict_type: str, conflict_owner: str, conflict_file):
@@ -310,87 +912,272 @@ def duplicate_response(conflict_type: str, conflict_owner: str, conflict_file):
         "conflictOwner": conflict_owner,
         "conflictFile": conflict_payload,
     }
-    return jsonify(payload), 409
+    return json_response(payload, 409)
+
 
+def parse_declared_file(file_data: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Validate a declared file in one pass, returning (payload, error message)."""
+    if not isinstance(file_data, dict):
+        return None, "file must be an object"
+    missing = [field for field in DECLARE_REQUIRED_FIELDS if field not in file_data]
+    if missing:
+        return None, f"missing file fields: {', '.join(missing)}"
 
+    payload = {field: file_data[field] for field in DECLARE_REQUIRED_FIELDS}
+    for field in DECLARE_OPTIONAL_FIELDS:
+        if field in file_data:
+            payload[field] = file_data[field]
+    try:
+        payload["size_gb"] = float(payload["size_gb"])
+        payload["seeds"] = int(payload["seeds"])
+        payload["peers"] = int(payload["peers"])
+    except (TypeError, ValueError):
+        return None, "size_gb, seeds, and peers must be numeric"
+    return payload, None
+
+
+def verify_declared_storage(payload: Dict[str, Any]) -> Optional[str]:
+    """Check that a declared storage_path holds the content its hashes claim."""
+    storage_path = payload.get("storage_path")
+    if not storage_path:
+        return None
+    resolved = os.path.realpath(storage_path)
+    if os.path.commonpath([resolved, os.path.realpath(UPLOAD_ROOT)]) != os.path.realpath(UPLOAD_ROOT):
+        return "storage_path must be inside the upload directory"
+    algorithm = str(payload.get("hash_algorithm") or "sha256").lower()
+    if algorithm not in CONTENT_HASHERS:
+        return f"unsupported hash_algorithm '{algorithm}'"
+    digest = compute_file_hash(resolved, algorithm)
+    if digest is None:
+        return "storage_path does not exist"
+
+    content_hash = str(payload.get("content_hash") or "").lower()
+    short_hash = str(payload.get("file_hash") or "").lower()
+    if content_hash and content_hash != digest:
+        return "content_hash does not match the stored file"
+    if short_hash and not digest.startswith(short_hash):
+        return "file_hash does not match the stored file"
+    payload["content_hash"] = digest
+    payload["hash_algorithm"] = algorithm
+    return None
+
+
+@lru_cache(maxsize=4096)
 def split_name(name: str) -> Tuple[str, str]:
-    base, ext = os.path.splitext(name or "")
-    cleaned_ext = ext[1:].lower() if ext else ""
-    return (base or name or "Unnamed"), cleaned_ext
+    value = name or ""
+    base, dot, ext = value.rpartition(".")
+    # Same rules as os.path.splitext: the dot must sit in the last path
+    # component and follow something other than dots (".bashrc" has no extension).
+    if not dot or "/" in ext or not base.rpartition("/")[2].lstrip("."):
+        return value or "Unnamed", ""
+    return base, ext.lower()
+
+
+@lru_cache(maxsize=4096)
+def quote_path_segment(value: str) -> str:
+    # Matches werkzeug's default path converter quoting.
+    return quote(value, safe="!$&'()*+,/:;=@")
+
+
+# Extension (without the dot, lower case) -> MIME type, built once from the
+# system tables instead of running mimetypes.guess_type per download.
+mimetypes.init()
+MIME_TYPES_BY_EXTENSION: Dict[str, str] = {
+    extension.lstrip(".").lower(): mime_type for extension, mime_type in mimetypes.types_map.items()
+}
+
+
+def guess_mime_type(file_obj, file_name: str) -> Optional[str]:
+    extension = getattr(file_obj, "extension", "") or split_name(file_name)[1]
+    return MIME_TYPES_BY_EXTENSION.get(extension.lower())
+
+
+@lru_cache(maxsize=4096)
+def format_upload_iso(upload_time: float) -> str:
+    return datetime.utcfromtimestamp(upload_time).isoformat() + "Z"
 
 
 def serialize_shared_file(file_obj, owner_username: str) -> Dict[str, Any]:
     """Convert SharedFile objects into dictionaries for the frontend."""
 
-    name = getattr(file_obj, "name", "Unnamed")
+    name = file_obj.name
     base_name, derived_extension = split_name(name)
-    extension = getattr(file_obj, "extension", "") or derived_extension
-    category_value = normalize_category(getattr(file_obj, "category", DEFAULT_CATEGORY))
-    size_gb = float(getattr(file_obj, "size_gb", 0.0) or 0.0)
-    size_mb = size_gb * 1024
-    uploader = getattr(file_obj, "uploader", owner_username or "community")
+    extension = file_obj.extension or derived_extension
+    category_value = normalize_category(file_obj.category)
+    size_gb = float(file_obj.size_gb or 0.0)
+    size_text = format_size(size_gb)
+    uploader = file_obj.uploader
     owner = owner_username or uploader or "community"
-    file_id = getattr(file_obj, "id", None)
-    upload_time = getattr(file_obj, "upload_time", None)
-    upload_iso: Optional[str] = None
-    if upload_time:
-        upload_iso = datetime.utcfromtimestamp(upload_time).isoformat() + "Z"
+    file_id = file_obj.id
+    upload_time = file_obj.upload_time
+    upload_iso = format_upload_iso(upload_time) if upload_time else None
+    storage_path = file_obj.storage_path
 
+    # Same URL url_for("api_download_file", ...) builds, without a URL map lookup per file.
     download_url = None
     if file_id is not None:
-        try:
-            download_url = url_for("api_download_file", owner=owner, file_id=file_id, _external=False)
-        except RuntimeError:
-            download_url = f"/api/files/{owner}/{file_id}/download"
+        download_url = f"/api/files/{quote_path_segment(owner)}/{file_id}/download"
 
     return {
         "id": f"{owner}-{file_id}" if owner and file_id is not None else str(file_id or name),
         "fileId": file_id,
         "owner": owner,
-        "ownerAddress": getattr(file_obj, "owner_address", ""),
+        "ownerAddress": file_obj.owner_address,
         "uploader": uploader,
-        "fileHash": getattr(file_obj, "file_hash", ""),
+        "fileHash": file_obj.file_hash,
         "name": name,
         "baseName": base_name,
         "extension": extension,
         "category": category_value,
         "categoryLabel": category_label(category_value),
-        "description": getattr(file_obj, "description", ""),
-        "size": format_size(size_gb),
-        "sizeText": format_size(size_gb),
+        "description": file_obj.description,
+        "size": size_text,
+        "sizeText": size_text,
         "sizeGB": size_gb,
-        "sizeMB": round(size_mb, 3),
-        "seeds": getattr(file_obj, "seeds", 0),
-        "peers": getattr(file_obj, "peers", 0),
+        "sizeMB": round(size_gb * 1024, 3),
+        "seeds": file_obj.seeds,
+        "peers": file_obj.peers,
         "downloadUrl": download_url,
         "canDownload": True,
-        "hasStorage": bool(getattr(file_obj, "storage_path", "")),
+        "hasStorage": bool(storage_path),
         "uploadTime": upload_time,
         "uploadTimeIso": upload_iso,
-        "storagePath": getattr(file_obj, "storage_path", ""),
-        "contentHash": getattr(file_obj, "content_hash", ""),
+        "storagePath": storage_path,
+        "contentHash": file_obj.content_hash,
+        "hashAlgorithm": file_obj.hash_algorithm,
     }
 
 
-def list_catalogue() -> List[Dict[str, Any]]:
-    """Aggregate shared files from the global catalogue and all users."""
-    results: List[Dict[str, Any]] = []
+def iter_serialized_resources(resources) -> Iterator[Any]:
+    """Yield ledger SharedFile objects in a form encode_json can serialize.
+
+    orjson encodes dataclasses natively (in field order, matching
+    SharedFile.to_dict), so the objects pass through untouched; the standard
+    library encoder needs the dictionary form.
+    """
+    if orjson is not None:
+        return iter(resources)
+    return (resource.to_dict() for resource in resources)
 
-    # Include globally seeded demo files.
-    for file_obj in system.global_resource_manager.get_active_files():
-        results.append(serialize_shared_file(file_obj, owner_username="community"))
 
-    # Include every registered user's active files.
-    for username, user in system.users.items():
-        for file_obj in user.resource_manager.get_active_files():
-            results.append(serialize_shared_file(file_obj, owner_username=username))
+def serialize_resources(resources) -> List[Any]:
+    """Convert ledger SharedFile objects into their raw dictionary form."""
+    return list(iter_serialized_resources(resources))
 
+
+def list_catalogue() -> List[Dict[str, Any]]:
+    """Aggregate shared files from the global catalogue and all users."""
+    # Globally seeded demo files come first, then every registered user's active files.
+    results = [serialize_shared_file(file_obj, owner_username=owner) for file_obj, owner in existing_files()]
     results.sort(key=lambda item: item.get("uploadTime") or 0, reverse=True)
     return results
 
 
+def encode_json(payload: Any) -> bytes:
+    """Serialize ``payload`` with orjson when available, else Flask's JSON provider."""
+    if orjson is None:
+        return app.json.dumps(payload).encode("utf-8")
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+
+def parse_json_body() -> Optional[Dict[str, Any]]:
+    """Decode the request body as a JSON object; None when it is malformed or not an object.
+
+    Bodies larger than MAX_JSON_BODY_BYTES never get this far (see
+    reject_oversized_json_body), and the raw bytes are not kept on the
+    request (cache=False) once decoded.
+    """
+    if (request.content_length or 0) > MAX_JSON_BODY_BYTES:
+        return None
+    try:
+        data = app.json.loads(request.get_data(cache=False))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@app.before_request
+def reject_oversized_json_body():
+    """Answer 413 for a non-multipart body over MAX_JSON_BODY_BYTES before any view reads it.
+
+    Views report a None from parse_json_body as a malformed payload (400);
+    a client that sent too much should be told so instead.
+    """
+    if (request.content_length or 0) > MAX_JSON_BODY_BYTES and request.mimetype != "multipart/form-data":
+        return error_response("request body too large", 413)
+
+
+def text_field(data: Any, key: str) -> str:
+    """Return ``data[key]`` stripped, or "" when it is missing, null or not a string.
+
+    Handlers test the result for emptiness, so a wrong type surfaces as the
+    usual "required" 400 instead of an AttributeError.
+    """
+    value = data.get(key)
+    return value.strip() if isinstance(value, str) else ""
+
+
+def json_response(payload: Any, status: int = 200):
+    return Response(encode_json(payload), status=status, mimetype="application/json")
+
+
 def error_response(msg: str, code: int = 400):
-    return jsonify({"success": False, "error": msg, "message": msg}), code
+    return json_response({"success": False, "error": msg, "message": msg}, code)
+
+
+def run_mining_job(miner: str):
+    if MINE_BATCH_WINDOW_SECONDS > 0:
+        flush_count = MINE_FLUSH_COUNT
+        with PENDING_CHANGED:
+            PENDING_CHANGED.wait_for(
+                lambda: MINE_FLUSH_COUNT != flush_count
+                or len(system.blockchain.pending_transactions) >= MINE_BATCH_MAX_TRANSACTIONS,
+                timeout=MINE_BATCH_WINDOW_SECONDS,
+            )
+    block = system.mine_block(miner)
+    if block is not None:
+        ledger_changed()
+    return block
+
+
+def submit_mining_job(miner: str) -> Future:
+    """Start a mining run for ``miner`` on MINING_EXECUTOR, or join the one in flight."""
+    with MINING_IN_FLIGHT_LOCK:
+        future = MINING_IN_FLIGHT.get(miner)
+        if future is not None and not future.done():
+            return future
+        future = MINING_EXECUTOR.submit(run_mining_job, miner)
+        MINING_IN_FLIGHT[miner] = future
+
+    def forget(done: Future) -> None:
+        with MINING_IN_FLIGHT_LOCK:
+            if MINING_IN_FLIGHT.get(miner) is done:
+                del MINING_IN_FLIGHT[miner]
+
+    future.add_done_callback(forget)
+    return future
+
+
+def register_mining_job(future: Future) -> str:
+    """Store ``future`` under a new job id for GET /api/jobs/<job_id>, pruning old jobs."""
+    job_id = uuid.uuid4().hex
+    now = time.monotonic()
+    with MINING_JOBS_LOCK:
+        while MINING_JOBS:
+            submitted_at, oldest = next(iter(MINING_JOBS.values()))
+            expired = oldest.done() and now - submitted_at > MINING_JOB_TTL_SECONDS
+            if not expired and len(MINING_JOBS) < MINING_JOBS_MAX_ENTRIES:
+                break
+            MINING_JOBS.popitem(last=False)
+        MINING_JOBS[job_id] = (now, future)
+    return job_id
+
+
+def mine_and_wait(miner: str):
+    """Mine for ``miner`` in the request thread, joining the batch window when one is set."""
+    if MINE_BATCH_WINDOW_SECONDS > 0:
+        return submit_mining_job(miner).result()
+    return run_mining_job(miner)
 
 
 def locate_file(owner_username: str, file_id: int):
@@ -412,26 +1199,29 @@ bootstrap_demo_accounts()
 
 @app.route("/api/login", methods=["POST"])
 def api_login():
-    try:
-        data: Dict[str, Any] = request.get_json(force=True)
-    except Exception:
+    data = parse_json_body()
+    if data is None:
         return error_response("invalid JSON payload", 400)
 
-    username = data.get("username", "").strip()
+    username = text_field(data, "username")
     password = data.get("password", "")
 
     if not username or not password:
         return error_response("username and password are required", 400)
 
-    user_record = USERS.get(username)
-    if not user_record or user_record.get("password") != password:
+    user_record = get_user_record(username)
+    if not verify_password(user_record, password):
         return error_response("Invalid username or password.", 401)
+    # The password is known to be right here, so an older hash can be replaced.
+    if password_needs_rehash(user_record):
+        save_user_record(username, {**user_record, "password_hash": hash_password(password)})
 
     ledger_user = ensure_ledger_user(username)
     wealth = system.get_user_balance(username)
+    token = f"demo-token-{username}"
 
-    return jsonify({
-        "token": f"demo-token-{username}",
+    return json_response({
+        "token": token,
         "username": username,
         "role": user_record.get("role", "user"),
         "ledgerIdentity": getattr(ledger_user, "address", None),
@@ -449,7 +1239,7 @@ def api_ledger_balance():
 
     viewer = request.args.get("viewer", "").strip()
     requester = viewer or username
-    if viewer and viewer not in USERS:
+    if viewer and get_user_role(viewer) is None:
         return error_response("requester is not recognized", 403)
     if requester != username and not is_administrator(requester):
         return error_response("only administrators can view other balances", 403)
@@ -459,7 +1249,7 @@ def api_ledger_balance():
 
     uploads = len(ledger_user.resource_manager.get_files_by_owner(ledger_user.address))
 
-    return jsonify({
+    return json_response({
         "username": username,
         "ledgerIdentity": getattr(ledger_user, "address", None),
         "wealth": balance,
@@ -471,49 +1261,27 @@ def api_ledger_balance():
 
 @app.route("/api/ledger/reward", methods=["POST"])
 def api_ledger_reward():
-    try:
-        data: Dict[str, Any] = request.get_json(force=True)
-    except Exception:
+    data = parse_json_body()
+    if data is None:
         return error_response("invalid JSON payload", 400)
 
-    username = data.get("username", "").strip()
+    username = text_field(data, "username")
     if not username:
         return error_response("missing field: username", 400)
 
     ensure_ledger_user(username)
-    block = system.mine_block(username)
+    block = mine_and_wait(username)
     if block is None:
         return error_response("no pending transactions to mine", 400)
 
-    block_lookup = next(
-        (entry for entry in system.list_blocks() if entry.get("index") == getattr(block, "index", None)),
+    block_entry = block.to_dict()
+    block_entry["miner_address"] = next(
+        (tx.receiver for tx in block.transactions if tx.transaction_type == "mining_reward"),
         None,
     )
-    if not block_lookup:
-        miner_address = None
-        for tx in getattr(block, "transactions", []):
-            if getattr(tx, "transaction_type", "") == "mining_reward":
-                miner_address = getattr(tx, "receiver", None)
-                break
-        block_lookup = {
-            "index": getattr(block, "index", None),
-            "hash": getattr(block, "hash", None),
-            "previous_hash": getattr(block, "previous_hash", None),
-            "timestamp": getattr(block, "timestamp", None),
-            "miner_address": miner_address,
-            "transactions": [
-                tx.to_dict() if hasattr(tx, "to_dict") else {
-                    "sender": getattr(tx, "sender", None),
-                    "receiver": getattr(tx, "receiver", None),
-                    "amount": getattr(tx, "amount", None),
-                    "transaction_type": getattr(tx, "transaction_type", None),
-                }
-                for tx in getattr(block, "transactions", [])
-            ],
-        }
-    block_payload = normalize_block_payload(block_lookup or {})
+    block_payload = normalize_block_payload(block_entry)
 
-    return jsonify({
+    return json_response({
         "success": True,
         "block": block_payload,
         "wealth": system.get_user_balance(username),
@@ -526,7 +1294,7 @@ def api_blocks() -> Any:
     if not viewer:
         return error_response("missing field: viewer", 400)
 
-    if viewer not in USERS:
+    if get_user_role(viewer) is None:
         return error_response("viewer is not recognized", 403)
 
     search = request.args.get("search", "")
@@ -541,18 +1309,26 @@ def api_blocks() -> Any:
             return error_response("block must be an integer", 400)
 
     payloads = list_blocks_for_viewer(viewer, search, block_filter, miner_param)
-    return jsonify({"blocks": payloads, "count": len(payloads)})
+    return json_response({"blocks": payloads, "count": len(payloads)})
 
 
 @app.route("/api/files", methods=["GET"])
 def api_list_files():
-    catalogue = list_catalogue()
-    return jsonify(catalogue)
+    return cached_json_response("files:catalogue", list_catalogue, policy="short")
+
+
+# The category list is fixed at import time, so its body and ETag are too.
+CATEGORIES_BODY = encode_json(FILE_CATEGORIES)
+CATEGORIES_ETAG = hashlib.sha256(CATEGORIES_BODY).hexdigest()[:32]
 
 
 @app.route("/api/files/categories", methods=["GET"])
 def api_file_categories():
-    return jsonify(FILE_CATEGORIES)
+    response = Response(CATEGORIES_BODY, mimetype="application/json")
+    response.set_etag(CATEGORIES_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
 
 
 @app.route("/api/files/validate-name", methods=["GET"])
@@ -566,7 +1342,7 @@ def api_validate_file_name():
     conflict_file, conflict_owner = find_name_conflict(username, base_name)
     if conflict_file is not None:
         payload = serialize_shared_file(conflict_file, owner_username=conflict_owner or "community")
-        return jsonify(
+        return json_response(
             {
                 "conflict": True,
                 "conflictType": "name",
@@ -576,7 +1352,148 @@ def api_validate_file_name():
             }
         )
 
-    return jsonify({"conflict": False, "baseName": base_name})
+    return json_response({"conflict": False, "baseName": base_name})
+
+
+class UploadSink:
+    """Hash an upload while writing it to a temporary file under UPLOAD_ROOT.
+
+    Bytes past MAX_UPLOAD_BYTES are counted but neither hashed nor written,
+    so clamp_upload_size can reject the upload without storing it.
+    """
+
+    def __init__(self) -> None:
+        self.hasher = CONTENT_HASHERS[CONTENT_HASH_ALGORITHM]()
+        self.size = 0
+        self.path: Optional[str] = None
+        self.handle = None
+
+    @property
+    def overflowed(self) -> bool:
+        return self.size > MAX_UPLOAD_BYTES
+
+    def open(self) -> None:
+        if self.path is not None:
+            raise RuntimeError("UploadSink.open() called twice")
+        self.handle = tempfile.NamedTemporaryFile(dir=UPLOAD_ROOT, prefix=".upload-", delete=False)
+        self.path = self.handle.name
+        if hasattr(os, "fchmod"):
+            os.fchmod(self.handle.fileno(), UPLOAD_FILE_MODE)
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.overflowed:
+            return
+        self.hasher.update(chunk)
+        self.handle.write(chunk)
+
+    def close(self) -> None:
+        if self.handle is None or self.handle.closed:
+            return
+        if hasattr(os, "posix_fadvise"):
+            # A large upload would otherwise push hotter pages out of the page
+            # cache; ask the kernel to write it back and drop it.
+            self.handle.flush()
+            try:
+                os.posix_fadvise(self.handle.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+        self.handle.close()
+
+    def discard(self) -> None:
+        """Close and delete the temporary file unless it was moved into place."""
+        self.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+if StreamingFormDataParser is not None:
+
+    class UploadSinkTarget(BaseTarget):
+        """streaming-form-data target feeding the "file" part into an UploadSink."""
+
+        def __init__(self, sink: UploadSink) -> None:
+            super().__init__()
+            self.sink = sink
+
+        def on_start(self) -> None:
+            # A second "file" part would reopen the sink, leaking the first
+            # temporary file and hashing both parts as one upload.
+            if self.sink.path is not None:
+                raise ParseFailedException("more than one file part")
+            self.sink.open()
+
+        def on_data_received(self, chunk: bytes) -> None:
+            self.sink.write(chunk)
+
+        def on_finish(self) -> None:
+            self.sink.close()
+
+
+UPLOAD_FORM_FIELDS = ("username", "name", "description", "category")
+
+
+def receive_streaming_upload() -> Optional[Tuple[Dict[str, str], Optional[str], UploadSink]]:
+    """Parse the multipart body straight off request.stream with streaming-form-data.
+
+    The file part is hashed and written as it arrives instead of being
+    spooled by werkzeug first. Returns None when the body is malformed or
+    carries more than one file part; raises ValidationError when a text field exceeds MAX_FORM_MEMORY_SIZE,
+    the cap werkzeug applies to the same fields.
+    """
+    sink = UploadSink()
+    file_target = UploadSinkTarget(sink)
+    # Flask 3.0 has no MAX_FORM_MEMORY_SIZE setting; werkzeug's own default then applies.
+    max_field_bytes = app.config.get("MAX_FORM_MEMORY_SIZE", 500_000)
+    field_targets = {
+        field: ValueTarget(validator=MaxSizeValidator(max_field_bytes) if max_field_bytes is not None else None)
+        for field in UPLOAD_FORM_FIELDS
+    }
+    try:
+        parser = StreamingFormDataParser(headers=request.headers)
+        parser.register("file", file_target)
+        for field, target in field_targets.items():
+            parser.register(field, target)
+        stream = request.stream
+        while not sink.overflowed:
+            chunk = stream.read(UPLOAD_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except ParseFailedException:
+        sink.discard()
+        return None
+    except BaseException:
+        sink.discard()
+        raise
+    sink.close()
+    form = {field: target.value.decode("utf-8", "replace") for field, target in field_targets.items()}
+    filename = file_target.multipart_filename if sink.path is not None else None
+    return form, filename, sink
+
+
+def receive_werkzeug_upload() -> Tuple[Dict[str, str], Optional[str], UploadSink]:
+    """Copy werkzeug's spooled "file" part into an UploadSink, hashing on the way."""
+    form = request.form.to_dict()
+    uploaded_file = request.files.get("file")
+    sink = UploadSink()
+    if uploaded_file is None or not uploaded_file.filename:
+        return form, None, sink
+    sink.open()
+    try:
+        uploaded_file.stream.seek(0)
+        for chunk in iter_file_chunks(uploaded_file.stream):
+            sink.write(chunk)
+            if sink.overflowed:
+                break
+    except BaseException:
+        sink.discard()
+        raise
+    sink.close()
+    return form, uploaded_file.filename, sink
 
 
 @app.route("/api/files", methods=["POST"])
@@ -585,63 +1502,65 @@ def api_publish_file():
     is_multipart = "multipart/form-data" in content_type
 
     if is_multipart:
-        form = request.form
-        uploaded_file = request.files.get("file")
-        username = (form.get("username") or "").strip()
-        provided_name = (form.get("name") or "").strip()
-        description = (form.get("description") or "").strip()
-        category_value = normalize_category(form.get("category"))
-
-        if uploaded_file is None or not uploaded_file.filename:
-            return error_response("a file must be provided", 400)
-
-        safe_name = secure_filename(uploaded_file.filename or "")
-        original_name = uploaded_file.filename or safe_name or "uploaded.bin"
-        name = provided_name or original_name
-        base_name, extension = split_name(name)
+        # The upload is hashed while it is written to a temporary file under
+        # UPLOAD_ROOT; it is renamed into the user's folder once the checks
+        # pass, and deleted on every other way out.
+        if StreamingFormDataParser is not None:
+            try:
+                received = receive_streaming_upload()
+            except ValidationError:
+                return error_response("form field too large", 413)
+            if received is None:
+                return error_response("invalid multipart payload", 400)
+        else:
+            received = receive_werkzeug_upload()
+        form, upload_filename, sink = received
+        try:
+            username = text_field(form, "username")
+            provided_name = text_field(form, "name")
+            description = text_field(form, "description")
+            category_value = normalize_category(form.get("category"))
 
-        if not username or not name:
-            return error_response("username and name are required", 400)
+            if not upload_filename:
+                return error_response("a file must be provided", 400)
 
-        conflict_file, conflict_owner = find_name_conflict(username, base_name)
-        if conflict_file is not None:
-            return duplicate_response("name", conflict_owner, conflict_file)
+            safe_name = secure_filename(upload_filename)
+            original_name = upload_filename or safe_name or "uploaded.bin"
+            name = provided_name or original_name
+            base_name, extension = split_name(name)
 
-        try:
-            uploaded_file.stream.seek(0)
-            hasher = hashlib.sha256()
-            total_size = 0
-            while True:
-                chunk = uploaded_file.stream.read(8192)
-                if not chunk:
-                    break
-                total_size += len(chunk)
-                hasher.update(chunk)
-            clamp_upload_size(total_size)
-        except ValueError as exc:
-            return error_response(str(exc), 400)
-        finally:
-            uploaded_file.stream.seek(0)
+            if not username or not name:
+                return error_response("username and name are required", 400)
 
-        file_hash_full = hasher.hexdigest()
-        file_hash_short = file_hash_full[:16]
+            conflict_file, conflict_owner = find_name_conflict(username, base_name)
+            if conflict_file is not None:
+                return duplicate_response("name", conflict_owner, conflict_file)
 
-        conflict_file, conflict_owner = find_content_conflict(username, file_hash_full, file_hash_short)
-        if conflict_file is not None:
-            return duplicate_response("content", conflict_owner, conflict_file)
+            try:
+                clamp_upload_size(sink.size)
+            except ValueError as exc:
+                return error_response(str(exc), 400)
+
+            file_hash_full = sink.hasher.hexdigest()
+            file_hash_short = file_hash_full[:16]
 
-        size_gb = bytes_to_gb(total_size)
-        size_text = format_size(size_gb)
+            conflict_file, conflict_owner = find_content_conflict(username, file_hash_full, file_hash_short)
+            if conflict_file is not None:
+                return duplicate_response("content", conflict_owner, conflict_file)
 
-        ledger_user = ensure_ledger_user(username)
+            size_gb = bytes_to_gb(sink.size)
 
-        user_folder = os.path.join(UPLOAD_ROOT, username)
-        os.makedirs(user_folder, exist_ok=True)
-        timestamp = int(time.time())
-        filename_parts = [str(timestamp), file_hash_short, safe_name or "uploaded.bin"]
-        stored_filename = "_".join(filter(None, filename_parts))
-        stored_path = os.path.join(user_folder, stored_filename)
-        uploaded_file.save(stored_path)
+            ensure_ledger_user(username)
+
+            user_folder = os.path.join(UPLOAD_ROOT, username)
+            os.makedirs(user_folder, exist_ok=True)
+            timestamp = int(time.time())
+            filename_parts = [str(timestamp), file_hash_short, safe_name or "uploaded.bin"]
+            stored_filename = "_".join(filter(None, filename_parts))
+            stored_path = os.path.join(user_folder, stored_filename)
+            os.replace(sink.path, stored_path)
+        finally:
+            sink.discard()
 
         file_payload = {
             "name": name,
@@ -654,32 +1573,30 @@ def api_publish_file():
             "extension": extension,
             "file_hash": file_hash_short,
             "content_hash": file_hash_full,
+            "hash_algorithm": CONTENT_HASH_ALGORITHM,
             "storage_path": stored_path,
         }
     else:
-        try:
-            data: Dict[str, Any] = request.get_json(force=True)
-        except Exception:
+        data = parse_json_body()
+        if data is None:
             return error_response("invalid JSON payload", 400)
 
-        username = data.get("username", "").strip()
-        name = data.get("name", "").strip()
-        size_text = data.get("size", "").strip()
-        description = (data.get("description") or "").strip()
+        username = text_field(data, "username")
+        name = text_field(data, "name")
+        size_text = text_field(data, "size")
+        description = text_field(data, "description")
         category_value = normalize_category(data.get("category"))
 
         if not username or not name or not size_text:
             return error_response("username, name, and size are required", 400)
 
-        ledger_user = ensure_ledger_user(username)
+        ensure_ledger_user(username)
 
         try:
             size_gb = parse_size_to_gb(size_text)
         except ValueError as exc:
             return error_response(str(exc), 400)
 
-        size_text = format_size(size_gb)
-
         base_name, extension = split_name(name)
         conflict_file, conflict_owner = find_name_conflict(username, base_name)
         if conflict_file is not None:
@@ -705,57 +1622,14 @@ def api_publish_file():
             "content_hash": file_hash_full,
         }
 
-    success = system.declare_user_resources(username, file_payload)
-    if not success:
+    # The ledger hands back the SharedFile it created, so the response is
+    # built from it directly instead of searching the owner's files by hash.
+    created_file = system.declare_user_resource_file(username, file_payload)
+    if created_file is None:
         return error_response("unable to publish file to ledger", 500)
+    ledger_changed()
 
-    ledger_user = ensure_ledger_user(username)
-    created_file = None
-    for file_obj in ledger_user.resource_manager.get_files_by_owner(ledger_user.address):
-        if getattr(file_obj, "file_hash", "") == file_payload["file_hash"]:
-            created_file = file_obj
-            break
-
-    created: Optional[Dict[str, Any]] = None
-    if created_file is not None:
-        created = serialize_shared_file(created_file, owner_username=username)
-    else:
-        for entry in list_catalogue():
-            if entry.get("fileHash") == file_payload["file_hash"]:
-                created = entry
-                break
-
-    if created is None:
-        now = time.time()
-        created = {
-            "id": f"{username}-{int(now)}",
-            "fileId": None,
-            "owner": username,
-            "ownerAddress": getattr(ledger_user, "address", ""),
-            "uploader": username,
-            "fileHash": file_payload["file_hash"],
-            "name": name,
-            "baseName": base_name,
-            "extension": extension,
-            "category": category_value,
-            "categoryLabel": category_label(category_value),
-            "description": description,
-            "size": size_text if not is_multipart else format_size(size_gb),
-            "sizeText": size_text if not is_multipart else format_size(size_gb),
-            "sizeGB": size_gb,
-            "sizeMB": round(size_gb * 1024, 3),
-            "seeds": 1,
-            "peers": 0,
-            "downloadUrl": None,
-            "canDownload": True,
-            "hasStorage": is_multipart,
-            "uploadTime": now,
-            "uploadTimeIso": datetime.utcfromtimestamp(now).isoformat() + "Z",
-            "contentHash": file_payload.get("content_hash", ""),
-            "storagePath": file_payload.get("storage_path", ""),
-        }
-
-    return jsonify(created), 201
+    return json_response(serialize_shared_file(created_file, owner_username=username), 201)
 
 
 @app.route("/api/files/<owner>/<int:file_id>", methods=["GET"])
@@ -765,7 +1639,33 @@ def api_file_detail(owner: str, file_id: int):
         return error_response("file not found", 404)
 
     payload = serialize_shared_file(file_obj, owner_username=normalized_owner or "community")
-    return jsonify(payload)
+    return json_response(payload)
+
+
+def x_accel_redirect_response(relative_path: str, file_obj, file_name: str, mime_type: Optional[str]):
+    """Let nginx send a stored upload: same headers as send_file, no body.
+
+    werkzeug's X-Sendfile mode already handles the conditional and range
+    logic without opening the file; its header is swapped for an
+    X-Accel-Redirect to the internal location.
+    """
+    absolute_path = os.path.join(UPLOAD_ROOT, relative_path)
+    response = werkzeug_send_file(
+        absolute_path,
+        request.environ,
+        mimetype=mime_type or "application/octet-stream",
+        as_attachment=True,
+        download_name=file_name,
+        etag=file_obj.content_hash or True,
+        last_modified=file_obj.upload_time,
+        max_age=app.get_send_file_max_age,
+        use_x_sendfile=True,
+        response_class=app.response_class,
+    )
+    if response.headers.pop("X-Sendfile", None) is not None:
+        url_path = quote(relative_path.replace(os.sep, "/"))
+        response.headers["X-Accel-Redirect"] = X_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + url_path
+    return response
 
 
 @app.route("/api/files/<owner>/<int:file_id>/download", methods=["GET"])
@@ -779,7 +1679,8 @@ def api_download_file(owner: str, file_id: int):
         track_attempts = not (
             normalized_owner and normalized_owner != "community" and downloader == normalized_owner
         )
-        if track_attempts and not has_downloads_remaining(downloader, normalized_owner, file_id):
+        attempt_key = build_download_key(downloader, normalized_owner, file_id) if track_attempts else None
+        if attempt_key and not has_downloads_remaining(attempt_key):
             return error_response("download attempts max at 2", 429)
         ensure_ledger_user(downloader)
         if normalized_owner and normalized_owner != "community" and downloader != normalized_owner:
@@ -787,24 +1688,33 @@ def api_download_file(owner: str, file_id: int):
             ledger_success = system.download_resource(downloader, normalized_owner, int(file_id))
             if not ledger_success:
                 return error_response("download failed (insufficient balance or file unavailable)", 400)
-            if track_attempts:
-                record_download_attempt(downloader, normalized_owner, file_id)
-        elif track_attempts:
-            record_download_attempt(downloader, normalized_owner, file_id)
+            ledger_changed()
+            if attempt_key:
+                record_download_attempt(attempt_key)
+        elif attempt_key:
+            record_download_attempt(attempt_key)
 
     file_name = getattr(file_obj, "name", f"download-{file_id}") or f"download-{file_id}"
     storage_path = getattr(file_obj, "storage_path", "")
-    mime_type, _ = mimetypes.guess_type(file_name)
+    mime_type = guess_mime_type(file_obj, file_name)
 
     if storage_path and os.path.isfile(storage_path):
         absolute_path = os.path.abspath(storage_path)
         if not absolute_path.startswith(ROOT):
             return error_response("file storage path is invalid", 403)
+        # The recorded content hash identifies the bytes, so it doubles as a
+        # strong ETag; werkzeug derives one from the file stat otherwise.
+        if X_ACCEL_REDIRECT_PREFIX:
+            relative_path = os.path.relpath(absolute_path, UPLOAD_ROOT)
+            if not relative_path.startswith(os.pardir):
+                return x_accel_redirect_response(relative_path, file_obj, file_name, mime_type)
         return send_file(
             absolute_path,
             as_attachment=True,
             download_name=file_name,
             mimetype=mime_type or "application/octet-stream",
+            etag=getattr(file_obj, "content_hash", "") or True,
+            last_modified=getattr(file_obj, "upload_time", None),
         )
 
     # Fallback: generate an informative payload so catalogue files can be downloaded
@@ -835,25 +1745,30 @@ def api_register():
     body: { "username": "alice" }
     """
     try:
-        data: Dict[str, Any] = request.get_json(force=True)
-        username = (data.get("username") or "").strip()
-        password = (data.get("password") or "").strip()
-        role = (data.get("role") or "member").strip() or "member"
+        data = parse_json_body()
+        if data is None:
+            return error_response("invalid JSON payload", 400)
+        username = text_field(data, "username")
+        password = text_field(data, "password")
+        role = sys.intern((data.get("role") or ROLE_MEMBER).strip() or ROLE_MEMBER)
 
         if not username or not password:
             return error_response("username and password are required", 400)
 
-        if system.get_user(username):
+        if user_exists(username):
             return error_response(f"username '{username}' already exists", 409)
 
-        if username in USERS:
+        try:
+            # The ledger rejects duplicates under its own lock, which also
+            # covers two registrations racing past the account check.
+            user = system.register_user(username, initial_credit=0.0)
+        except ValueError:
             return error_response(f"username '{username}' already exists", 409)
-
-        user = system.register_user(username, initial_credit=0.0)
         system.register_address(username, getattr(user, "address", None))
-        USERS[username] = {"password": password, "role": role}
+        save_user_record(username, {"password_hash": hash_password(password), "role": role})
+        ledger_changed()
 
-        return jsonify({
+        return json_response({
             "success": True,
             "username": username,
             "address": getattr(user, "address", None),
@@ -861,7 +1776,7 @@ def api_register():
             "initialWealth": system.get_user_balance(username),
         })
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -875,7 +1790,9 @@ def api_declare():
     }
     """
     try:
-        data: Dict[str, Any] = request.get_json(force=True)
+        data = parse_json_body()
+        if data is None:
+            return error_response("invalid JSON payload", 400)
         username = data.get("username")
         file_data = data.get("file")
         if not username or not file_data:
@@ -885,13 +1802,20 @@ def api_declare():
         if not user:
             return error_response("user not found", 404)
 
-        success = system.declare_user_resources(username, file_data)
+        file_payload, problem = parse_declared_file(file_data)
+        if not problem:
+            problem = verify_declared_storage(file_payload)
+        if problem:
+            return error_response(problem, 400)
+
+        success = system.declare_user_resources(username, file_payload)
         if success:
-            return jsonify({"success": True, "message": "resource declared (added to pending txs)"})
+            ledger_changed()
+            return json_response({"success": True, "message": "resource declared (added to pending txs)"})
         else:
             return error_response("declare failed (see hyperledger logs)", 500)
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -906,30 +1830,41 @@ def api_download():
     }
     """
     try:
-        data: Dict[str, Any] = request.get_json(force=True)
+        data = parse_json_body()
+        if data is None:
+            return error_response("invalid JSON payload", 400)
         downloader = data.get("downloader")
         owner = data.get("owner")
         file_id = data.get("file_id")
         if not downloader or not owner or file_id is None:
             return error_response("missing downloader/owner/file_id", 400)
 
-        normalized_owner = (owner or "").strip().lower() or "community"
-        track_attempts = not (
-            normalized_owner != "community" and downloader.strip().lower() == normalized_owner
-        )
-        if track_attempts and not has_downloads_remaining(downloader, normalized_owner, int(file_id)):
+        # Normalise once; the key doubles as the lowercased names for the
+        # self-download check, so over-limit requests never reach the ledger.
+        attempt_key = build_download_key(downloader, owner, file_id)
+        downloader_key, owner_key, file_id = attempt_key
+        own_file = owner_key != "community" and downloader_key == owner_key
+        if not own_file and not has_downloads_remaining(attempt_key):
             return error_response("download attempts max at 2", 429)
 
+        # Owners fetch their own files without a ledger transaction, as on the
+        # GET download route; the ledger would only refuse the self-payment.
+        if own_file:
+            file_obj, _, _ = locate_file(owner, file_id)
+            if not file_obj or not file_obj.is_active:
+                return error_response("download failed (insufficient balance, missing file, or other)", 400)
+            return json_response({"success": True, "message": "own file: no download transaction needed"})
+
         # System-level convenience method per your doc
-        ok = system.download_resource(downloader, owner, int(file_id))
+        ok = system.download_resource(downloader, owner, file_id)
         if ok:
-            if track_attempts:
-                record_download_attempt(downloader, normalized_owner, int(file_id))
-            return jsonify({"success": True, "message": "download transaction added to pending pool"})
+            ledger_changed()
+            record_download_attempt(attempt_key)
+            return json_response({"success": True, "message": "download transaction added to pending pool"})
         else:
             return error_response("download failed (insufficient balance, missing file, or other)", 400)
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -937,29 +1872,64 @@ def api_download():
 def api_mine():
     """
     POST /api/mine
-    body: { "miner": "alice" }
+    body: { "miner": "alice", "async": false }
+
+    With "async": true the block is mined on MINING_EXECUTOR and the response
+    is 202 with a job_id to poll via GET /api/jobs/<job_id>.
     """
     try:
-        data: Dict[str, Any] = request.get_json(force=True)
+        data = parse_json_body()
+        if data is None:
+            return error_response("invalid JSON payload", 400)
         miner = data.get("miner")
         if not miner:
             return error_response("missing field: miner", 400)
 
+        if data.get("async"):
+            job_id = register_mining_job(submit_mining_job(miner))
+            return json_response({"success": True, "job_id": job_id, "status": "pending"}, 202)
+
         # mine_block returns a Block per your doc
-        block = system.mine_block(miner)
+        block = mine_and_wait(miner)
         if block is None:
             return error_response("no pending transactions to mine", 400)
 
-        # Block is expected to have to_dict method (or attributes)
-        block_dict = block.to_dict() if hasattr(block, "to_dict") else {
-            "index": getattr(block, "index", None)
-        }
-        return jsonify({"success": True, "block": block_dict})
+        return json_response({"success": True, "block": block.to_dict()})
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
+@app.route("/api/mine/flush", methods=["POST"])
+def api_mine_flush():
+    """Wake mining runs waiting in the batch window so they mine immediately."""
+    global MINE_FLUSH_COUNT
+    with PENDING_CHANGED:
+        MINE_FLUSH_COUNT += 1
+        PENDING_CHANGED.notify_all()
+    return json_response({"success": True, "waiting": len(MINING_IN_FLIGHT)})
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id: str):
+    with MINING_JOBS_LOCK:
+        entry = MINING_JOBS.get(job_id)
+        if entry is None:
+            return error_response("job not found", 404)
+        future = entry[1]
+        if not future.done():
+            return json_response({"success": True, "job_id": job_id, "status": "pending"})
+        del MINING_JOBS[job_id]
+
+    exc = future.exception()
+    if exc is not None:
+        return error_response(str(exc), 500)
+    block = future.result()
+    if block is None:
+        return error_response("no pending transactions to mine", 400)
+    return json_response({"success": True, "job_id": job_id, "status": "done", "block": block.to_dict()})
+
+
 @app.route("/api/balance/<username>", methods=["GET"])
 def api_balance(username: str):
     username = username.strip()
@@ -968,7 +1938,7 @@ def api_balance(username: str):
 
     viewer = request.args.get("viewer", "").strip()
     requester = viewer or username
-    if viewer and viewer not in USERS:
+    if viewer and get_user_role(viewer) is None:
         return error_response("requester is not recognized", 403)
     if requester != username and not is_administrator(requester):
         return error_response("only administrators can view other balances", 403)
@@ -977,20 +1947,24 @@ def api_balance(username: str):
         user = system.get_user(username)
         if not user:
             return error_response("user not found", 404)
-        balance = system.get_user_balance(username)
-        return jsonify({"success": True, "username": username, "balance": balance})
+        return cached_json_response(
+            f"balance:{username}",
+            lambda: {"success": True, "username": username, "balance": system.get_user_balance(username)},
+        )
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
 @app.route("/api/blockchain", methods=["GET"])
 def api_blockchain_info():
     try:
-        info = system.get_blockchain_info()
-        return jsonify({"success": True, "blockchain_info": info})
+        return cached_json_response(
+            "stats:system",
+            lambda: {"success": True, "blockchain_info": system.get_blockchain_info()},
+        )
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -1013,21 +1987,25 @@ def api_search_resources():
         if "min_seeds" in q and q.get("min_seeds"):
             kwargs["min_seeds"] = int(q.get("min_seeds"))
 
-        results = system.search_resources(**kwargs)
-        # Each result expected to have to_dict()
-        return jsonify({"success": True, "results": [r.to_dict() for r in results]})
+        return cached_json_response(
+            # Keyed on the parsed filters, so unknown or reordered parameters share an entry.
+            "resources:search:" + repr(tuple(kwargs.items())),
+            lambda: {"success": True, "results": serialize_resources(system.search_resources(**kwargs))},
+        )
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
 @app.route("/api/resources/all", methods=["GET"])
 def api_get_all_resources():
     try:
-        results = system.get_all_resources()
-        return jsonify({"success": True, "results": [r.to_dict() for r in results]})
+        return stream_cached_results(
+            "resources:all",
+            iter_serialized_resources(system.iter_all_resources()),
+        )
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -1038,9 +2016,9 @@ def api_get_user_files(username: str):
         if not user:
             return error_response("user not found", 404)
         files = user.get_my_files()
-        return jsonify({"success": True, "files": [f.to_dict() for f in files]})
+        return json_response({"success": True, "files": serialize_resources(files)})
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -1052,11 +2030,12 @@ def api_delete_user_file(username: str, file_id: int):
             return error_response("user not found", 404)
         ok = user.remove_my_file(file_id)
         if ok:
-            return jsonify({"success": True, "message": "file removed"})
+            ledger_changed()
+            return json_response({"success": True, "message": "file removed"})
         else:
             return error_response("remove failed (not found or not owner)", 400)
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -1067,7 +2046,9 @@ def api_update_user_file(username: str, file_id: int):
     body: { "update": { ... } }
     """
     try:
-        payload: Dict[str, Any] = request.get_json(force=True)
+        payload = parse_json_body()
+        if payload is None:
+            return error_response("invalid JSON payload", 400)
         update_data = payload.get("update")
         if not update_data:
             return error_response("missing update data", 400)
@@ -1076,11 +2057,12 @@ def api_update_user_file(username: str, file_id: int):
             return error_response("user not found", 404)
         updated = user.update_my_file(file_id, update_data)
         if updated:
-            return jsonify({"success": True, "file": updated.to_dict()})
+            ledger_changed()
+            return json_response({"success": True, "file": updated.to_dict()})
         else:
-            return error_response("update failed (not found or not owner)", 400)
+            return error_response("update failed (not found, not owner or invalid value)", 400)
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
@@ -1095,7 +2077,9 @@ def api_report():
     We do NOT perform chain rollbacks here.
     """
     try:
-        data: Dict[str, Any] = request.get_json(force=True)
+        data = parse_json_body()
+        if data is None:
+            return error_response("invalid JSON payload", 400)
         reporter = data.get("reporter")
         owner = data.get("owner")
         file_id = data.get("file_id")
@@ -1110,15 +2094,16 @@ def api_report():
 
         # get_file then update to set is_active False via update_file if available
         rm = owner_user.resource_manager
-        target = rm.get_file(int(file_id))
+        fid = int(file_id)
+        target = rm.get_file(fid)
         if not target:
             return error_response("file not found", 404)
 
         # Use update_file to change is_active if allowed by hyperledger implementation
-        update_payload = {"is_active": False}
-        updated = rm.update_file(int(file_id), update_payload, owner_user.address)
+        updated = rm.update_file(fid, {"is_active": False}, owner_user.address)
         if updated:
-            return jsonify({
+            ledger_changed()
+            return json_response({
                 "success": True,
                 "message": f"file {file_id} marked inactive (reported). Admin review required.",
                 "file": updated.to_dict(),
@@ -1128,10 +2113,17 @@ def api_report():
             # If update_file rejects (e.g., not permitted), fallback to error
             return error_response("failed to mark file inactive via ResourceManager.update_file", 500)
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
+# Review actions that only toggle a file's visibility: action -> (is_active, message).
+REVIEW_ACTIONS: Dict[str, Tuple[bool, str]] = {
+    "approve": (True, "resource approved"),
+    "remove": (False, "resource removed (inactive)"),
+}
+
+
 @app.route("/api/admin/review", methods=["POST"])
 def api_admin_review():
     """
@@ -1149,7 +2141,9 @@ def api_admin_review():
     rollback -> NOT IMPLEMENTED here (requires hyperledger-level balance/rollback APIs)
     """
     try:
-        data: Dict[str, Any] = request.get_json(force=True)
+        data = parse_json_body()
+        if data is None:
+            return error_response("invalid JSON payload", 400)
         admin = data.get("admin")
         owner = data.get("owner")
         file_id = data.get("file_id")
@@ -1163,22 +2157,20 @@ def api_admin_review():
             return error_response("owner not found", 404)
 
         rm = owner_user.resource_manager
-        target = rm.get_file(int(file_id))
+        fid = int(file_id)
+        target = rm.get_file(fid)
         if not target:
             return error_response("file not found", 404)
 
-        if action == "approve":
-            updated = rm.update_file(int(file_id), {"is_active": True}, owner_user.address)
-            if updated:
-                return jsonify({"success": True, "message": "resource approved", "file": updated.to_dict()})
-            else:
-                return error_response("approve failed", 500)
-        elif action == "remove":
-            updated = rm.update_file(int(file_id), {"is_active": False}, owner_user.address)
+        review = REVIEW_ACTIONS.get(action) if isinstance(action, str) else None
+        if review is not None:
+            is_active, message = review
+            updated = rm.update_file(fid, {"is_active": is_active}, owner_user.address)
             if updated:
-                return jsonify({"success": True, "message": "resource removed (inactive)", "file": updated.to_dict()})
+                ledger_changed()
+                return json_response({"success": True, "message": message, "file": updated.to_dict()})
             else:
-                return error_response("remove failed", 500)
+                return error_response(f"{action} failed", 500)
         elif action == "rollback":
             # We do not implement chain/balance rollbacks in app layer.
             # This requires hyperledger resource to expose a safe API to deduct credits or emit rollback tx.
@@ -1189,10 +2181,24 @@ def api_admin_review():
         else:
             return error_response("unknown action", 400)
     except Exception as e:  # pragma: no cover - defensive logging for dev server
-        traceback.print_exc()
+        logger.exception("%s %s failed", request.method, request.path)
         return error_response(str(e), 500)
 
 
 if __name__ == "__main__":
-    # Run as module recommended: python -m backend.app  (from project root)
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # python -m backend.app (from project root). With FLASK_DEV=1, or when
+    # gunicorn is not installed, this runs Werkzeug's development server;
+    # otherwise the process is replaced by gunicorn serving backend.wsgi:app,
+    # which imports the app afresh so no thread started here is lost to a fork.
+    if os.environ.get("FLASK_DEV") != "1" and importlib.util.find_spec("gunicorn") is not None:
+        os.execv(sys.executable, [
+            sys.executable, "-m", "gunicorn",
+            "--chdir", ROOT,
+            "--bind", "0.0.0.0:5000",
+            "--worker-class", "gthread",
+            "--workers", "1",  # the ledger lives in process memory
+            "--threads", os.environ.get("GUNICORN_THREADS", "8"),
+            "--keep-alive", "5",  # keep polling clients' connections open between requests
+            "backend.wsgi:app",
+        ])
+    app.run(host="0.0.0.0", port=5000, debug=os.environ.get("FLASK_DEV") == "1", threaded=True)
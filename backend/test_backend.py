@@ -0,0 +1,401 @@
+# backend/test_backend.py
+import gzip
+import io
+import os
+import random
+import stat
+import sys
+import time
+import unittest
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# test_app.py 在导入时用 MagicMock 替换了这些模块；这里要测试真实的 backend.app
+for module_name in ("flask_cors", "hyperledger", "hyperledger.ledger"):
+    if isinstance(sys.modules.get(module_name), MagicMock):
+        del sys.modules[module_name]
+
+from backend import app as appmod  # noqa: E402
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        """每个测试使用独立的 fakeredis 服务器，模拟设置了 REDIS_URL 的部署"""
+        server = fakeredis.FakeServer()
+        patchers = [
+            patch.object(appmod, "redis_client", fakeredis.FakeRedis(server=server, decode_responses=True)),
+            patch.object(appmod, "redis_cache_client", fakeredis.FakeRedis(server=server)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = appmod.app.test_client()
+
+    def test_cache_hits_are_served_from_redis(self):
+        """第二次请求命中 Redis 缓存，返回与第一次相同的字节"""
+        for path in ("/api/blockchain", "/api/files"):
+            first = self.client.get(path)
+            second = self.client.get(path)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(first.get_data(), second.get_data())
+            self.assertEqual(first.headers["ETag"], second.headers["ETag"])
+        self.assertTrue(appmod.redis_cache_client.exists("cache:stats:system"))
+
+    def test_stale_body_is_served_from_redis_when_rebuild_fails(self):
+        """缓存失效后重建失败时，返回 Redis 中保存的旧响应"""
+        first = self.client.get("/api/blockchain")
+        appmod.ledger_changed()
+        with patch.object(appmod.system, "get_blockchain_info", side_effect=RuntimeError("ledger down")):
+            stale = self.client.get("/api/blockchain")
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.get_data(), first.get_data())
+
+
+class TestInProcessResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(appmod, "redis_cache_client", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = appmod.app.test_client()
+        appmod.ledger_changed()
+        self.addCleanup(appmod.ledger_changed)
+
+    def test_search_key_ignores_unknown_parameters(self):
+        """未知查询参数不会产生新的缓存条目"""
+        for index in range(20):
+            response = self.client.get(f"/api/resources?keyword=guide&x={index}")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(appmod.RESPONSE_CACHE), 1)
+
+    def test_cache_is_bounded_and_drops_expired_entries(self):
+        """缓存条目数有上限，过期条目在读取时被删除"""
+        with patch.object(appmod, "RESPONSE_CACHE_MAX_ENTRIES", 4):
+            for index in range(10):
+                appmod.set_cached_response(f"key:{index}", b"{}")
+            self.assertEqual(list(appmod.RESPONSE_CACHE), [f"key:{index}" for index in range(6, 10)])
+        appmod.set_cached_response("expired", b"{}", ttl=-1)
+        self.assertIsNone(appmod.get_cached_response("expired"))
+        self.assertNotIn("expired", appmod.RESPONSE_CACHE)
+
+    def test_stale_body_expires(self):
+        """旧响应超过 STALE_RESPONSE_TTL_SECONDS 后不再用于失败回退"""
+        self.client.get("/api/blockchain")
+        appmod.ledger_changed()
+        with patch.object(appmod.system, "get_blockchain_info", side_effect=RuntimeError("ledger down")):
+            self.assertEqual(self.client.get("/api/blockchain").status_code, 200)
+            with patch.object(appmod.time, "monotonic", return_value=time.monotonic() + appmod.STALE_RESPONSE_TTL_SECONDS + 1):
+                self.assertEqual(self.client.get("/api/blockchain").status_code, 500)
+        self.assertNotIn("stats:system", appmod.STALE_RESPONSES)
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        patchers = [patch.object(appmod, "redis_cache_client", None), patch.object(appmod, "COMPRESS_MIN_BYTES", 0)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = appmod.app.test_client()
+        appmod.ledger_changed()
+        self.addCleanup(appmod.ledger_changed)
+
+    def get(self, accept_encoding, **headers):
+        return self.client.get("/api/blockchain", headers={"Accept-Encoding": accept_encoding, **headers})
+
+    def test_gzip_is_negotiated(self):
+        """接受 gzip 的客户端得到压缩响应、Vary 头和带编码后缀的 ETag"""
+        plain = self.get("identity")
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertIn("Accept-Encoding", plain.vary)
+        etag = plain.get_etag()[0]
+
+        compressed = self.get("gzip")
+        self.assertEqual(compressed.status_code, 200)
+        self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", compressed.vary)
+        self.assertEqual(compressed.get_etag()[0], f"{etag}-gzip")
+        self.assertEqual(gzip.decompress(compressed.get_data()), plain.get_data())
+
+        revalidated = self.get("gzip", **{"If-None-Match": compressed.headers["ETag"]})
+        self.assertEqual(revalidated.status_code, 304)
+
+    @unittest.skipIf(appmod.brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred_when_available(self):
+        """安装 brotli 时优先使用 br 编码"""
+        plain = self.get("identity")
+        compressed = self.get("gzip, br")
+        self.assertEqual(compressed.headers["Content-Encoding"], "br")
+        self.assertEqual(compressed.get_etag()[0], f"{plain.get_etag()[0]}-br")
+        self.assertEqual(appmod.brotli.decompress(compressed.get_data()), plain.get_data())
+
+
+class TestPasswords(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(appmod, "redis_client", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = appmod.app.test_client()
+
+    def test_verify_password(self):
+        """正确密码通过，错误密码、未知用户和非字符串密码均被拒绝"""
+        record = {"password_hash": appmod.hash_password("s3cret")}
+        self.assertTrue(appmod.verify_password(record, "s3cret"))
+        self.assertFalse(appmod.verify_password(record, "S3cret"))
+        self.assertFalse(appmod.verify_password(None, "s3cret"))
+        self.assertFalse(appmod.verify_password(record, None))
+        self.assertFalse(appmod.verify_password({"password_hash": "garbage"}, "s3cret"))
+
+    def test_login_upgrades_legacy_hash(self):
+        """登录成功时把迭代次数不同的旧哈希换成当前参数的哈希"""
+        username = f"legacy-{uuid.uuid4().hex[:8]}"
+        with patch.object(appmod, "PASSWORD_HASH_ITERATIONS", 1000):
+            legacy_hash = appmod.hash_password("s3cret")
+        with patch.dict(appmod.USERS, {username: {"password_hash": legacy_hash, "role": appmod.ROLE_MEMBER}}):
+            wrong = self.client.post("/api/login", json={"username": username, "password": "nope"})
+            self.assertEqual(wrong.status_code, 401)
+            self.assertEqual(appmod.USERS[username]["password_hash"], legacy_hash)
+
+            response = self.client.post("/api/login", json={"username": username, "password": "s3cret"})
+            self.assertEqual(response.status_code, 200)
+            upgraded = appmod.USERS[username]["password_hash"]
+            self.assertTrue(upgraded.startswith(f"pbkdf2_sha256${appmod.PASSWORD_HASH_ITERATIONS}$"))
+            self.assertEqual(appmod.USERS[username]["role"], appmod.ROLE_MEMBER)
+            self.assertFalse(appmod.password_needs_rehash(appmod.USERS[username]))
+
+            again = self.client.post("/api/login", json={"username": username, "password": "s3cret"})
+            self.assertEqual(again.status_code, 200)
+            self.assertEqual(appmod.USERS[username]["password_hash"], upgraded)
+
+
+class TestJsonBodies(unittest.TestCase):
+
+    def setUp(self):
+        self.client = appmod.app.test_client()
+
+    def test_oversized_body_is_413(self):
+        """超过 MAX_JSON_BODY_BYTES 的 JSON 请求体返回 413"""
+        padding = "x" * appmod.MAX_JSON_BODY_BYTES
+        response = self.client.post("/api/login", json={"username": "bob", "password": padding})
+        self.assertEqual(response.status_code, 413)
+
+    def test_malformed_body_is_400(self):
+        """格式错误的 JSON 仍返回 400"""
+        response = self.client.post("/api/login", data="{not json", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestSplitName(unittest.TestCase):
+
+    def test_known_names(self):
+        """有无扩展名、以点开头、多个点的文件名"""
+        cases = {
+            "report.PDF": ("report", "pdf"),
+            "README": ("README", ""),
+            ".bashrc": (".bashrc", ""),
+            "..hidden": ("..hidden", ""),
+            ".config.json": (".config", "json"),
+            "archive.tar.gz": ("archive.tar", "gz"),
+            "a..b": ("a.", "b"),
+            "name.": ("name", ""),
+            "...": ("...", ""),
+            "dir.v2/file": ("dir.v2/file", ""),
+            "": ("Unnamed", ""),
+        }
+        for name, expected in cases.items():
+            self.assertEqual(appmod.split_name(name), expected, name)
+
+    def test_matches_splitext(self):
+        """与原先基于 os.path.splitext 的实现结果一致"""
+        rng = random.Random(5)
+        for _ in range(5000):
+            name = "".join(rng.choice("ab./X") for _ in range(rng.randint(0, 8)))
+            base, ext = os.path.splitext(name)
+            expected = (base or name or "Unnamed", ext[1:].lower() if ext else "")
+            self.assertEqual(appmod.split_name(name), expected, name)
+
+
+class TestStreamedResults(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(appmod, "redis_cache_client", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = appmod.app.test_client()
+        appmod.ledger_changed()
+        self.addCleanup(appmod.ledger_changed)
+
+    def test_error_before_first_item_returns_500(self):
+        """第一项之前的账本错误仍由视图捕获，返回 JSON 500"""
+        def failing():
+            raise RuntimeError("ledger down")
+            yield  # pragma: no cover
+
+        with patch.object(appmod.system, "iter_all_resources", failing):
+            response = self.client.get("/api/resources/all")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()["error"], "ledger down")
+
+    def test_error_mid_stream_is_logged_and_not_cached(self):
+        """流式输出中途出错时记录日志，且不写入缓存"""
+        resources = list(appmod.system.iter_all_resources())[:1]
+
+        def failing():
+            yield from resources
+            raise RuntimeError("ledger down")
+
+        with patch.object(appmod.system, "iter_all_resources", failing):
+            response = self.client.get("/api/resources/all")
+            with self.assertLogs("backend.app", "ERROR"), self.assertRaises(RuntimeError):
+                response.get_data()
+        self.assertIsNone(appmod.get_cached_response("resources:all"))
+
+
+class TestMiningJobs(unittest.TestCase):
+
+    def test_unpolled_jobs_are_pruned(self):
+        """无人查询的已完成任务在超时或超出上限后被清理"""
+        finished = Future()
+        finished.set_result(None)
+        with patch.object(appmod, "MINING_JOBS", OrderedDict()), patch.object(appmod, "MINING_JOBS_MAX_ENTRIES", 3):
+            job_ids = [appmod.register_mining_job(finished) for _ in range(5)]
+            self.assertEqual(list(appmod.MINING_JOBS), job_ids[2:])
+            with patch.object(appmod, "MINING_JOB_TTL_SECONDS", -1):
+                latest = appmod.register_mining_job(Future())
+            self.assertEqual(list(appmod.MINING_JOBS), [latest])
+
+
+class TestUploads(unittest.TestCase):
+
+    def setUp(self):
+        self.client = appmod.app.test_client()
+
+    def publish(self, payload: bytes, **fields):
+        data = {"username": "bob", "category": "archive"}
+        data.update(fields)
+        data["file"] = (io.BytesIO(payload), f"upload-{uuid.uuid4().hex}.bin")
+        return self.client.post("/api/files", data=data, content_type="multipart/form-data")
+
+    def test_stored_upload_uses_umask_mode(self):
+        """上传文件的权限与普通 open() 创建的文件一致，而不是临时文件的 0600"""
+        response = self.publish(os.urandom(4096))
+        self.assertEqual(response.status_code, 201)
+        stored_path = response.get_json()["storagePath"]
+        self.addCleanup(os.remove, stored_path)
+        self.assertEqual(stat.S_IMODE(os.stat(stored_path).st_mode), appmod.UPLOAD_FILE_MODE)
+
+    def test_oversized_form_field_is_rejected(self):
+        """超过 MAX_FORM_MEMORY_SIZE 的文本字段返回 413，且不写入账本"""
+        before = len(appmod.system.get_user("bob").get_all_available_files())
+        description = "x" * (appmod.app.config["MAX_FORM_MEMORY_SIZE"] + 1)
+        response = self.publish(os.urandom(4096), description=description)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(len(appmod.system.get_user("bob").get_all_available_files()), before)
+
+    def test_owner_download_ignores_username_case(self):
+        """所有者以不同大小写下载自己的文件时不产生下载交易"""
+        published = self.publish(os.urandom(4096)).get_json()
+        self.addCleanup(os.remove, published["storagePath"])
+        pending = len(appmod.system.blockchain.pending_transactions)
+        payload = {"downloader": " BOB ", "owner": "bob", "file_id": published["fileId"]}
+        for _ in range(3):
+            response = self.client.post("/api/download", json=payload)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("own file", response.get_json()["message"])
+        self.assertEqual(len(appmod.system.blockchain.pending_transactions), pending)
+
+    @unittest.skipIf(appmod.StreamingFormDataParser is None, "streaming-form-data is not installed")
+    def test_second_file_part_is_rejected(self):
+        """请求中出现第二个 file 部分时返回 400，且不残留临时文件"""
+        before = set(os.listdir(appmod.UPLOAD_ROOT))
+        data = {
+            "username": "bob",
+            "file": [(io.BytesIO(b"first"), "first.bin"), (io.BytesIO(b"second"), "second.bin")],
+        }
+        response = self.client.post("/api/files", data=data, content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(os.listdir(appmod.UPLOAD_ROOT)), before)
+
+    def test_upload_sink_opens_once(self):
+        """UploadSink 不允许重复打开"""
+        sink = appmod.UploadSink()
+        sink.open()
+        self.addCleanup(sink.discard)
+        with self.assertRaises(RuntimeError):
+            sink.open()
+
+
+
+class TestConflictIndex(unittest.TestCase):
+
+    setUp = TestUploads.setUp
+    publish = TestUploads.publish
+
+    def assert_index_matches_ledger(self):
+        """索引与直接遍历账本得到的名称和哈希一致"""
+        names = defaultdict(list)
+        hashes = defaultdict(list)
+        for position, (file_obj, owner) in enumerate(appmod.iter_existing_files()):
+            names[appmod.split_name(file_obj.name)[0].strip().lower()].append((position, file_obj.id, owner))
+            if file_obj.file_hash:
+                hashes[file_obj.file_hash.lower()].append((position, file_obj.id, owner))
+        index = appmod.conflict_index()
+        self.assertEqual(self.entry_ids(index.names), dict(names))
+        self.assertEqual(self.entry_ids(index.short_hashes), dict(hashes))
+
+    @staticmethod
+    def entry_ids(table):
+        return {key: [(position, file_obj.id, owner) for position, file_obj, owner in entries] for key, entries in table.items()}
+
+    def test_index_follows_publish_update_and_delete(self):
+        """发布、改名、删除后索引与账本保持同步，且跳过调用者自己的文件"""
+        payload = os.urandom(4096)
+        published = self.publish(payload).get_json()
+        self.addCleanup(os.remove, published["storagePath"])
+        base, file_id = published["baseName"], published["fileId"]
+        content_hash, short_hash = published["contentHash"], published["fileHash"]
+        self.assert_index_matches_ledger()
+        self.assertEqual(appmod.find_name_conflict("alice", base.upper())[1], "bob")
+        self.assertEqual(appmod.find_name_conflict("bob", base), (None, None))
+        self.assertEqual(appmod.find_content_conflict("alice", content_hash, short_hash)[0].id, file_id)
+
+        renamed = f"renamed-{uuid.uuid4().hex}"
+        response = self.client.put(f"/api/user/bob/file/{file_id}", json={"update": {"name": renamed + ".bin"}})
+        self.assertEqual(response.status_code, 200)
+        self.assert_index_matches_ledger()
+        self.assertEqual(appmod.find_name_conflict("alice", base), (None, None))
+        self.assertEqual(appmod.find_name_conflict("alice", renamed)[0].id, file_id)
+
+        response = self.client.delete(f"/api/user/bob/file/{file_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assert_index_matches_ledger()
+        self.assertEqual(appmod.find_name_conflict("alice", renamed), (None, None))
+        self.assertEqual(appmod.find_content_conflict("alice", content_hash, short_hash), (None, None))
+
+    def test_duplicate_publish_is_rejected(self):
+        """其他用户发布同名或同内容的文件时返回冲突"""
+        payload = os.urandom(4096)
+        published = self.publish(payload).get_json()
+        self.addCleanup(os.remove, published["storagePath"])
+        same_name = self.publish(os.urandom(4096), username="alice", name=published["name"])
+        self.assertEqual(same_name.status_code, 409)
+        same_content = self.publish(payload, username="alice")
+        self.assertEqual(same_content.status_code, 409)
+
+
+if __name__ == "__main__":
+    unittest.main()
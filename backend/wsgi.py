@@ -0,0 +1,17 @@
+"""WSGI entry point for running the backend under a production server.
+
+Example (from the project root)::
+
+    gunicorn -k gthread --workers 1 --threads 8 --keep-alive 5 backend.wsgi:app
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.app import app  # noqa: E402
+
+__all__ = ["app"]
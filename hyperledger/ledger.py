@@ -1,13 +1,28 @@
+import bisect
 import hashlib
 import json
+import math
+import sys
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import threading
 from collections import defaultdict
 from dataclasses import dataclass
 
-@dataclass
+# 信用积分规则常量
+CREDIT_PER_GB = 1000  # 每GB上传奖励 / 下载成本
+MINER_FEE_RATE = 0.001  # 矿工费率
+DOWNLOAD_BONUS_PER_GB = 100  # 被下载时所有者获得的额外奖励（每GB）
+MIN_DOWNLOAD_BONUS = 1.0  # 额外奖励下限
+FEE_TRANSACTION_TYPES = frozenset(("resource_download", "transfer"))  # 需要计算矿工费的交易类型
+NUMERIC_UPDATE_FIELDS = {"size_gb": float, "seeds": int, "peers": int}  # 更新时转换为数字的字段
+TEXT_UPDATE_FIELDS = frozenset(("name", "description", "category"))  # 更新时必须是字符串的字段
+
+# Python 3.10+ 的 dataclass 支持 slots，省去每个实例的 __dict__
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**DATACLASS_SLOTS)
 class SharedFile:
     """共享文件资源类"""
     id: int
@@ -25,6 +40,7 @@ class SharedFile:
     upload_time: float = None  # 上传时间戳
     is_active: bool = True  # 是否活跃可用
     storage_path: str = ""  # 后端保存的文件路径（可选）
+    hash_algorithm: str = "sha256"  # content_hash 使用的哈希算法
     
     def __post_init__(self):
         if self.upload_time is None:
@@ -48,6 +64,7 @@ class SharedFile:
             'upload_time': self.upload_time,
             'is_active': self.is_active,
             'storage_path': self.storage_path,
+            'hash_algorithm': self.hash_algorithm,
         }
     
     @classmethod
@@ -61,6 +78,12 @@ class ResourceManager:
         self.files: Dict[int, SharedFile] = {}  # 文件ID到文件的映射
         self.next_file_id = 1
         self.lock = threading.Lock()
+        # 搜索索引：分类 -> 文件ID集合；按大小/种子数排序的 (值, 文件ID) 列表用于范围查询
+        self.category_index: Dict[str, set] = defaultdict(set)
+        self.size_index: List[Tuple[float, int]] = []
+        self.seeds_index: List[Tuple[int, int]] = []
+        # 关键词索引：名称/描述（小写）中的三字符片段 -> 文件ID集合，用于缩小子串匹配的候选范围
+        self.trigram_index: Dict[str, set] = defaultdict(set)
         
         # 初始化一些示例文件
         self._initialize_sample_files()
@@ -108,6 +131,72 @@ class ResourceManager:
         
         for file in sample_files:
             self.files[file.id] = file
+            self._index_file(file)
+
+    def _index_file(self, file: SharedFile):
+        """将文件加入搜索索引"""
+        self.category_index[file.category].add(file.id)
+        bisect.insort(self.size_index, (file.size_gb, file.id))
+        bisect.insort(self.seeds_index, (file.seeds, file.id))
+        for gram in self._file_trigrams(file):
+            self.trigram_index[gram].add(file.id)
+
+    def _unindex_file(self, file: SharedFile):
+        """从搜索索引中移除文件"""
+        ids = self.category_index.get(file.category)
+        if ids is not None:
+            ids.discard(file.id)
+            if not ids:
+                del self.category_index[file.category]
+        self._remove_sorted(self.size_index, (file.size_gb, file.id))
+        self._remove_sorted(self.seeds_index, (file.seeds, file.id))
+        for gram in self._file_trigrams(file):
+            ids = self.trigram_index.get(gram)
+            if ids is not None:
+                ids.discard(file.id)
+                if not ids:
+                    del self.trigram_index[gram]
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        """拆分字符串的所有三字符片段"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @classmethod
+    def _file_trigrams(cls, file: SharedFile) -> set:
+        """文件名称与描述（小写）的三字符片段，与 search_files 的匹配规则一致"""
+        return cls._trigrams(file.name.lower()) | cls._trigrams(file.description.lower())
+
+    @staticmethod
+    def _remove_sorted(index: List[Tuple[Any, int]], entry: Tuple[Any, int]):
+        """二分查找并删除有序索引中的条目"""
+        position = bisect.bisect_left(index, entry)
+        if position < len(index) and index[position] == entry:
+            del index[position]
+
+    @staticmethod
+    def _coerce_field(key: str, value: Any) -> Any:
+        """把更新值转换为字段的类型（大小、种子数进入有序索引，文本进入片段索引），无效时抛出 ValueError"""
+        if key in NUMERIC_UPDATE_FIELDS:
+            if isinstance(value, bool):
+                raise ValueError(key)
+            try:
+                number = NUMERIC_UPDATE_FIELDS[key](value)
+            except (TypeError, OverflowError) as exc:
+                raise ValueError(key) from exc
+            if not math.isfinite(number) or number < 0 or (isinstance(value, float) and number != value):
+                raise ValueError(key)
+            return number
+        if key in TEXT_UPDATE_FIELDS and not isinstance(value, str):
+            raise ValueError(key)
+        return value
+
+    @staticmethod
+    def _ids_in_range(index: List[Tuple[Any, int]], low_value=None, high_value=None) -> set:
+        """二分查找有序索引，返回值落在 [low_value, high_value] 内的文件ID集合"""
+        low = bisect.bisect_left(index, (low_value,)) if low_value is not None else 0
+        high = bisect.bisect_right(index, (high_value, float("inf"))) if high_value is not None else len(index)
+        return {file_id for _, file_id in index[low:high]}
     
     def _get_next_id(self) -> int:
         """获取下一个文件ID"""
@@ -122,6 +211,7 @@ class ResourceManager:
                 file_id = self._get_next_id()
                 file = SharedFile(id=file_id, **file_data)
                 self.files[file_id] = file
+                self._index_file(file)
                 print(f"文件添加成功: {file.name} (ID: {file_id})")
                 return file
             except Exception as e:
@@ -142,6 +232,7 @@ class ResourceManager:
                 print(f"无权删除文件: 文件属于 {file.owner_address}")
                 return False
             
+            self._unindex_file(file)
             del self.files[file_id]
             print(f"文件删除成功: {file.name} (ID: {file_id})")
             return True
@@ -160,10 +251,21 @@ class ResourceManager:
                 print(f"无权更新文件: 文件属于 {file.owner_address}")
                 return None
             
-            # 更新字段
+            # 先校验全部字段，任何一项无效都不修改文件和索引
+            changes = {}
             for key, value in update_data.items():
                 if hasattr(file, key) and key not in ['id', 'owner_address']:
-                    setattr(file, key, value)
+                    try:
+                        changes[key] = self._coerce_field(key, value)
+                    except ValueError:
+                        print(f"无效的字段值: {key}={value!r}")
+                        return None
+            
+            # 更新字段（分类或大小可能变化，先移出索引再重新加入）
+            self._unindex_file(file)
+            for key, value in changes.items():
+                setattr(file, key, value)
+            self._index_file(file)
             
             print(f"文件更新成功: {file.name} (ID: {file_id})")
             return file
@@ -182,26 +284,38 @@ class ResourceManager:
         """搜索文件"""
         results = []
         
-        for file in self.files.values():
+        # 先用分类、大小、种子数索引缩小候选集合（从最小的集合开始求交集），再逐个检查其余条件
+        filters = []
+        if category:
+            filters.append(self.category_index.get(category, set()))
+        if min_size is not None or max_size is not None:
+            filters.append(self._ids_in_range(self.size_index, min_size, max_size))
+        if min_seeds is not None:
+            filters.append(self._ids_in_range(self.seeds_index, min_seeds))
+        
+        # 关键词只转换一次小写；子串必然包含其全部三字符片段，故片段索引的交集是候选的超集，
+        # 最终仍逐个做子串匹配确认（少于三个字符的关键词不走索引）
+        keyword_lower = keyword.lower() if keyword else None
+        if keyword_lower and len(keyword_lower) >= 3:
+            gram_sets = sorted(
+                (self.trigram_index.get(gram, set()) for gram in self._trigrams(keyword_lower)),
+                key=len,
+            )
+            filters.append(gram_sets[0].intersection(*gram_sets[1:]))
+        
+        if not filters:
+            candidates = list(self.files.values())
+        else:
+            filters.sort(key=len)
+            candidate_ids = set(filters[0]).intersection(*filters[1:])
+            candidates = [self.files[file_id] for file_id in sorted(candidate_ids) if file_id in self.files]
+        
+        for file in candidates:
             if not file.is_active:
                 continue
             
             # 关键词搜索
-            if keyword and keyword.lower() not in file.name.lower() and keyword.lower() not in file.description.lower():
-                continue
-            
-            # 分类筛选
-            if category and file.category != category:
-                continue
-            
-            # 大小筛选
-            if min_size is not None and file.size_gb < min_size:
-                continue
-            if max_size is not None and file.size_gb > max_size:
-                continue
-            
-            # 种子数筛选
-            if min_seeds is not None and file.seeds < min_seeds:
+            if keyword_lower and keyword_lower not in file.name.lower() and keyword_lower not in file.description.lower():
                 continue
             
             results.append(file)
@@ -223,8 +337,10 @@ class ResourceManager:
                 return False
             
             file = self.files[file_id]
+            self._remove_sorted(self.seeds_index, (file.seeds, file.id))
             file.seeds = max(0, file.seeds + seeds_delta)
             file.peers = max(0, file.peers + peers_delta)
+            bisect.insort(self.seeds_index, (file.seeds, file.id))
             return True
     
     def get_file_count(self) -> int:
@@ -285,9 +401,17 @@ class Block:
         return hashlib.sha256(block_string.encode()).hexdigest()
     
     def mine_block(self):
-        while self.hash[:self.difficulty] != '0' * self.difficulty:
+        # 区块头中 nonce 之前的部分在挖矿过程中不变，预先计算其哈希状态，
+        # 每次尝试只需复制该状态并追加 nonce 与交易哈希串
+        target = '0' * self.difficulty
+        prefix = hashlib.sha256(f"{self.index}{self.timestamp}{self.previous_hash}".encode())
+        suffix = "".join([tx.hash for tx in self.transactions]).encode()
+        while not self.hash.startswith(target):
             self.nonce += 1
-            self.hash = self.calculate_hash()
+            candidate = prefix.copy()
+            candidate.update(str(self.nonce).encode())
+            candidate.update(suffix)
+            self.hash = candidate.hexdigest()
     
     def to_dict(self) -> Dict:
         return {
@@ -310,6 +434,10 @@ class Blockchain:
         self.mining_reward = 50.0
         self.reward_halving_interval = 210000
         self.lock = threading.Lock()
+        # 余额缓存：地址 -> 余额，按链上顺序增量累加已确认区块，避免每次查询遍历整条链
+        self.balances: Dict[str, float] = defaultdict(float)
+        self.balanced_height = 0  # 已计入余额缓存的区块数
+        self.balance_lock = threading.Lock()
         
         print("区块链初始化完成，创世区块已创建")
     
@@ -353,7 +481,7 @@ class Blockchain:
             
             print(f"开始处理 {len(self.pending_transactions)} 个待处理交易...")
             
-            total_fees = sum(tx.amount * 0.001 for tx in self.pending_transactions if tx.transaction_type in ["resource_download", "transfer"])
+            total_fees = sum(tx.amount * MINER_FEE_RATE for tx in self.pending_transactions if tx.transaction_type in FEE_TRANSACTION_TYPES)
             current_reward = self.calculate_current_reward() + total_fees
             
             print(f"区块奖励: {current_reward} (基础奖励: {self.calculate_current_reward()}, 交易费用: {total_fees})")
@@ -393,16 +521,16 @@ class Blockchain:
         return current_reward
     
     def get_balance(self, address: str) -> float:
-        balance = 0.0
-        
-        for block in self.chain:
-            for transaction in block.transactions:
-                if transaction.receiver == address:
-                    balance += transaction.amount
-                if transaction.sender == address and transaction.sender != "0":
-                    balance -= transaction.amount
-        
-        return balance
+        with self.balance_lock:
+            # 只累加上次查询之后新增的区块，累加顺序与逐块遍历完全一致
+            chain_length = len(self.chain)
+            for block in self.chain[self.balanced_height:chain_length]:
+                for transaction in block.transactions:
+                    self.balances[transaction.receiver] += transaction.amount
+                    if transaction.sender != "0":
+                        self.balances[transaction.sender] -= transaction.amount
+            self.balanced_height = chain_length
+            return self.balances.get(address, 0.0)
     
     def is_chain_valid(self) -> bool:
         for i in range(1, len(self.chain)):
@@ -423,6 +551,8 @@ class Blockchain:
 # 修改User类，集成ResourceManager
 class User:
     """用户类"""
+    __slots__ = ("username", "address", "blockchain", "resource_manager", "initial_credit")
+
     def __init__(self, username: str, blockchain: Blockchain, initial_credit: float = 10000.0):
         self.username = username
         self.address = hashlib.sha256(f"{username}{time.time()}".encode()).hexdigest()[:16]
@@ -449,16 +579,20 @@ class User:
     
     def declare_resources(self, file_data: Dict) -> bool:
         """声明资源（上传文件）"""
+        return self.declare_resource_file(file_data) is not None
+    
+    def declare_resource_file(self, file_data: Dict) -> Optional[SharedFile]:
+        """声明资源并返回新建的文件对象，失败时返回 None"""
         # 设置文件所有者
         file_data['owner_address'] = self.address
         
         # 添加文件到资源管理器
         file = self.resource_manager.add_file(file_data)
         if not file:
-            return False
+            return None
         
         # 计算获得的信用
-        credit_earned = file.size_gb * 1000
+        credit_earned = file.size_gb * CREDIT_PER_GB
         
         print(f"用户 {self.username} 声明资源: {file.name}, 大小: {file.size_gb}GB, 获得信用: {credit_earned}")
         
@@ -478,8 +612,9 @@ class User:
             print(f"资源声明交易添加失败")
             # 如果交易失败，移除文件
             self.resource_manager.remove_file(file.id, self.address)
+            return None
         
-        return success
+        return file
     
     def download_resource(self, file_id: int, downloader: 'User') -> bool:
         """下载其他用户的资源"""
@@ -492,8 +627,8 @@ class User:
             print("不能下载自己的文件")
             return False
         
-        download_cost = file.size_gb * 1000
-        miner_fee = download_cost * 0.001
+        download_cost = file.size_gb * CREDIT_PER_GB
+        miner_fee = download_cost * MINER_FEE_RATE
         total_cost = download_cost + miner_fee
         
         print(f"下载成本: {download_cost} (资源费) + {miner_fee} (矿工费) = {total_cost}")
@@ -521,7 +656,7 @@ class User:
             # 更新种子数（下载者成为新的种子）
             self.resource_manager.update_seeds_peers(file_id, seeds_delta=1)
             # 系统额外奖励所有者少量货币
-            bonus_amount = max(file.size_gb * 100, 1.0)
+            bonus_amount = max(file.size_gb * DOWNLOAD_BONUS_PER_GB, MIN_DOWNLOAD_BONUS)
             bonus_transaction = Transaction(
                 sender="0",
                 receiver=file.owner_address,
@@ -574,17 +709,23 @@ class ResourceSharingSystem:
         self.users: Dict[str, User] = {}
         self.address_book: Dict[str, str] = {}
         self.global_resource_manager = ResourceManager()  # 全局资源管理器
+        self.lock = threading.Lock()  # 保护用户注册，避免并发请求重复创建用户
         print("资源共享系统初始化完成")
 
     def register_user(self, username: str, initial_credit: float = 10000.0) -> User:
-        if username in self.users:
-            raise ValueError(f"用户名 {username} 已存在")
+        with self.lock:
+            if username in self.users:
+                raise ValueError(f"用户名 {username} 已存在")
 
-        user = User(username, self.blockchain, initial_credit=initial_credit)
-        self.users[username] = user
-        self.address_book[user.address] = username
+            user = User(username, self.blockchain, initial_credit=initial_credit)
+            self.users[username] = user
+            self.address_book[user.address] = username
         return user
 
+    def list_users(self) -> List[Tuple[str, User]]:
+        """获取用户快照，遍历期间其他线程注册用户也不会影响迭代"""
+        return list(self.users.items())
+
     def get_user(self, username: str) -> Optional[User]:
         return self.users.get(username)
 
@@ -600,30 +741,21 @@ class ResourceSharingSystem:
         for block in self.blockchain.chain:
             miner_address = None
             miner_username = None
-            for transaction in getattr(block, "transactions", []):
-                tx_type = getattr(transaction, "transaction_type", "")
-                if tx_type == "mining_reward":
-                    miner_address = getattr(transaction, "receiver", None)
+            for transaction in block.transactions:
+                if transaction.transaction_type == "mining_reward":
+                    miner_address = transaction.receiver
                     miner_username = self.get_username_by_address(miner_address)
                     break
 
             blocks.append(
                 {
-                    "index": getattr(block, "index", None),
-                    "hash": getattr(block, "hash", None),
-                    "previous_hash": getattr(block, "previous_hash", None),
-                    "timestamp": getattr(block, "timestamp", None),
+                    "index": block.index,
+                    "hash": block.hash,
+                    "previous_hash": block.previous_hash,
+                    "timestamp": block.timestamp,
                     "miner_address": miner_address,
                     "miner": miner_username,
-                    "transactions": [
-                        tx.to_dict() if hasattr(tx, "to_dict") else {
-                            "sender": getattr(tx, "sender", None),
-                            "receiver": getattr(tx, "receiver", None),
-                            "amount": getattr(tx, "amount", None),
-                            "transaction_type": getattr(tx, "transaction_type", None),
-                        }
-                        for tx in getattr(block, "transactions", [])
-                    ],
+                    "transactions": [tx.to_dict() for tx in block.transactions],
                 }
             )
 
@@ -637,6 +769,14 @@ class ResourceSharingSystem:
             return False
         return user.declare_resources(file_data)
     
+    def declare_user_resource_file(self, username: str, file_data: Dict) -> Optional[SharedFile]:
+        """用户声明资源，返回新建的文件对象（用户不存在或声明失败时返回 None）"""
+        user = self.get_user(username)
+        if not user:
+            print(f"用户 {username} 不存在")
+            return None
+        return user.declare_resource_file(file_data)
+    
     def download_resource(self, downloader_username: str, file_owner_username: str, file_id: int) -> bool:
         """下载资源"""
         downloader = self.get_user(downloader_username)
@@ -673,18 +813,27 @@ class ResourceSharingSystem:
     def search_resources(self, **kwargs) -> List[SharedFile]:
         """全局搜索资源"""
         all_files = []
-        for user in self.users.values():
+        for _, user in self.list_users():
             user_files = user.search_available_files(**kwargs)
             all_files.extend(user_files)
         return all_files
     
     def get_all_resources(self) -> List[SharedFile]:
         """获取所有可用资源"""
-        all_files = []
-        for user in self.users.values():
-            user_files = user.get_all_available_files()
-            all_files.extend(user_files)
-        return all_files
+        return list(self.iter_all_resources())
+
+    def iter_all_resources(self) -> Iterator[SharedFile]:
+        """逐个产出所有可用资源，避免构建中间列表（用于流式响应）"""
+        for _, user in self.list_users():
+            yield from user.get_all_available_files()
+
+    def iter_active_files(self) -> Iterator[Tuple[str, SharedFile]]:
+        """逐个产出 (所有者用户名, 文件)：先是全局资源（所有者记为 "community"），再是各用户的可用资源"""
+        for file in self.global_resource_manager.get_active_files():
+            yield "community", file
+        for username, user in self.list_users():
+            for file in user.get_all_available_files():
+                yield username, file
 
 # 测试运行
 if __name__ == "__main__":
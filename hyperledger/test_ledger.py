@@ -0,0 +1,167 @@
+# hyperledger/test_ledger.py
+import os
+import random
+import sys
+import unittest
+from collections import defaultdict
+from unittest.mock import MagicMock
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# backend/test_app.py 在导入时用 MagicMock 替换了 hyperledger；这里要测试真实的账本
+for module_name in ("hyperledger", "hyperledger.ledger"):
+    if isinstance(sys.modules.get(module_name), MagicMock):
+        del sys.modules[module_name]
+
+from hyperledger.ledger import Blockchain, ResourceManager, Transaction  # noqa: E402
+
+WORDS = ["data", "python", "seed", "nexus", "Guide", "OST", "toolkit", "alpha", "beta", "ab", "x"]
+CATEGORIES = ["document", "audio", "software", "video", "other"]
+KEYWORDS = WORDS + ["DATA", "a", "ta py", "zzz", "新", "ython", "a be", "ytho"]
+
+
+def linear_search(rm, keyword=None, category=None, min_size=None, max_size=None, min_seeds=None):
+    """逐个扫描文件的参考实现（索引引入之前的 search_files 逻辑）"""
+    results = []
+    for file in rm.files.values():
+        if not file.is_active:
+            continue
+        if keyword and keyword.lower() not in file.name.lower() and keyword.lower() not in file.description.lower():
+            continue
+        if category and file.category != category:
+            continue
+        if min_size is not None and file.size_gb < min_size:
+            continue
+        if max_size is not None and file.size_gb > max_size:
+            continue
+        if min_seeds is not None and file.seeds < min_seeds:
+            continue
+        results.append(file)
+    return results
+
+
+def chain_balance(chain, address):
+    """遍历整条链计算余额的参考实现"""
+    balance = 0.0
+    for block in chain:
+        for transaction in block.transactions:
+            if transaction.receiver == address:
+                balance += transaction.amount
+            if transaction.sender == address:
+                balance -= transaction.amount
+    return balance
+
+
+class TestResourceIndexes(unittest.TestCase):
+
+    def setUp(self):
+        """随机生成文件，再做一轮更新、删除和种子数变化"""
+        self.random = random.Random(7)
+        self.rm = ResourceManager()
+        for index in range(300):
+            self.rm.add_file({
+                "name": " ".join(self.random.sample(WORDS, 2)) + f" {index}.bin",
+                "size_gb": round(self.random.random(), 3),
+                "uploader": "u",
+                "seeds": self.random.randint(0, 50),
+                "peers": 0,
+                "description": " ".join(self.random.sample(WORDS, 3)),
+                "owner_address": "a",
+                "category": self.random.choice(CATEGORIES),
+            })
+        file_ids = list(self.rm.files)
+        for _ in range(80):
+            file_id = self.random.choice(file_ids)
+            roll = self.random.random()
+            if roll < 0.3:
+                self.rm.remove_file(file_id)
+            elif roll < 0.7:
+                self.rm.update_file(file_id, {
+                    "category": self.random.choice(CATEGORIES),
+                    "size_gb": round(self.random.random(), 3),
+                    "name": self.random.choice(WORDS) + " new",
+                    "description": self.random.choice(WORDS),
+                    "seeds": self.random.randint(0, 50),
+                })
+            elif roll < 0.85:
+                self.rm.update_file(file_id, {"is_active": self.random.random() < 0.5})
+            else:
+                self.rm.update_seeds_peers(file_id, seeds_delta=self.random.randint(-5, 5))
+
+    def test_search_matches_linear_scan(self):
+        """索引查询与逐个扫描的结果（含顺序）一致"""
+        for _ in range(1000):
+            filters = {}
+            if self.random.random() < 0.5:
+                filters["keyword"] = self.random.choice(KEYWORDS)[: self.random.randint(1, 8)]
+            if self.random.random() < 0.4:
+                filters["category"] = self.random.choice(CATEGORIES + ["nope"])
+            if self.random.random() < 0.4:
+                filters["min_size"] = round(self.random.random(), 3)
+            if self.random.random() < 0.4:
+                filters["max_size"] = round(self.random.random(), 3)
+            if self.random.random() < 0.4:
+                filters["min_seeds"] = self.random.randint(0, 60)
+            expected = [file.id for file in linear_search(self.rm, **filters)]
+            self.assertEqual([file.id for file in self.rm.search_files(**filters)], expected, filters)
+
+    def test_indexes_match_files(self):
+        """各索引与当前文件内容保持一致"""
+        files = self.rm.files.values()
+        self.assertEqual(self.rm.size_index, sorted((file.size_gb, file.id) for file in files))
+        self.assertEqual(self.rm.seeds_index, sorted((file.seeds, file.id) for file in files))
+        categories = defaultdict(set)
+        trigrams = defaultdict(set)
+        for file in files:
+            categories[file.category].add(file.id)
+            for gram in self.rm._file_trigrams(file):
+                trigrams[gram].add(file.id)
+        self.assertEqual(dict(self.rm.category_index), dict(categories))
+        self.assertEqual(dict(self.rm.trigram_index), dict(trigrams))
+
+    def test_invalid_update_changes_nothing(self):
+        """无效的更新值被整体拒绝，文件与索引不变，之后仍可正常删除"""
+        file_id = next(iter(self.rm.files))
+        before = self.rm.files[file_id].to_dict()
+        for update in ({"size_gb": "big"}, {"seeds": 1.5}, {"name": "new", "size_gb": float("nan")}, {"category": None}):
+            self.assertIsNone(self.rm.update_file(file_id, update), update)
+            self.assertEqual(self.rm.files[file_id].to_dict(), before)
+        self.test_indexes_match_files()
+        self.assertTrue(self.rm.remove_file(file_id))
+        self.test_indexes_match_files()
+
+    def test_numeric_strings_are_converted(self):
+        """数字字符串转换为数字后再进入有序索引"""
+        file_id = next(iter(self.rm.files))
+        updated = self.rm.update_file(file_id, {"size_gb": "5", "seeds": "7"})
+        self.assertEqual((updated.size_gb, updated.seeds), (5.0, 7))
+        self.test_indexes_match_files()
+        self.assertEqual([file.id for file in self.rm.search_files(min_size=4.5)], [file_id])
+
+
+class TestIncrementalBalances(unittest.TestCase):
+
+    def test_balances_match_full_chain_walk(self):
+        """增量余额与遍历整条链的结果一致，包括区块之间穿插的查询"""
+        rng = random.Random(11)
+        blockchain = Blockchain()
+        addresses = ["alice", "bob", "carol"]
+        for address in addresses:
+            blockchain.add_transaction(Transaction("0", address, 1000.0, "initial_credit"))
+        blockchain.mine_pending_transactions("alice")
+        for _ in range(6):
+            for _ in range(rng.randint(1, 4)):
+                sender, receiver = rng.sample(addresses, 2)
+                amount = round(rng.uniform(0.1, 50.0), 3)
+                blockchain.add_transaction(Transaction(sender, receiver, amount, "transfer"))
+            if rng.random() < 0.5:
+                # 在新区块产生前查询，检验已缓存的部分不会被重复累加
+                blockchain.get_balance(rng.choice(addresses))
+            blockchain.mine_pending_transactions(rng.choice(addresses))
+            for address in addresses:
+                self.assertEqual(blockchain.get_balance(address), chain_balance(blockchain.chain, address))
+
+
+if __name__ == "__main__":
+    unittest.main()